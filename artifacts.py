@@ -0,0 +1,211 @@
+"""Persisted TF-IDF vectorizers and document matrices.
+
+Fitting a ``TfidfVectorizer`` over a large registry is slow, so the fitted
+state is written once as an artifact directory, one per version under
+``<artifact_dir>/<name>/``:
+
+    manifest.json       format version, source hash, vectorizer params,
+                        matrix shape and a SHA-256 per file
+    vocabulary.json     term -> column
+    idf.npy             IDF weights
+    matrix.*.npy        CSR data / indices / indptr of the document matrix
+
+At startup the arrays are memory-mapped and the vectorizer is rebuilt from
+the vocabulary and IDF weights without refitting. A new version is built
+only when the source data hash, the parameters or the format changes; a
+finished version is never modified, so a reader never mixes two builds.
+"""
+import hashlib
+import json
+import os
+import sys
+
+from importlib.metadata import version
+
+import numpy as np
+import scipy.sparse as sp
+
+from locks import file_lock
+from registry import file_sha256, remove_old_versions
+
+# Importing scikit-learn costs over a second, so it is deferred to the
+# vectorizer constructors below
+SKLEARN_VERSION = version('scikit-learn')
+
+FORMAT_VERSION = 1
+
+DEFAULT_ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'artifacts')
+
+ARRAY_FILES = ('idf', 'matrix.data', 'matrix.indices', 'matrix.indptr')
+
+
+def texts_sha256(texts):
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _artifact_key(source_hash, params):
+    # The fitted state depends on the data, the parameters and sklearn's tokenizer
+    payload = json.dumps([source_hash, params, SKLEARN_VERSION], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _make_vectorizer(params):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    params = dict(params)
+    if 'ngram_range' in params:
+        params['ngram_range'] = tuple(params['ngram_range'])
+    return TfidfVectorizer(**params)
+
+
+def _write_replace(target, write, mode='wb'):
+    # A per-process temp name, so concurrent builders never share a file
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, mode, encoding=None if 'b' in mode else 'utf-8') as f:
+        write(f)
+    os.replace(tmp, target)
+
+
+def _vectorizer_from(params, vocabulary, idf):
+    vectorizer = _make_vectorizer(params)
+    vectorizer.vocabulary_ = vocabulary
+    vectorizer.idf_ = idf
+    return vectorizer
+
+
+def build_tfidf(path, texts, source_hash, params):
+    """Fit a vectorizer on ``texts`` and write it and its matrix to ``path``."""
+    params = json.loads(json.dumps(params))  # tuples -> lists, as stored
+    vectorizer = _make_vectorizer(params)
+    matrix = vectorizer.fit_transform(texts).tocsr()
+    os.makedirs(path, exist_ok=True)
+
+    arrays = {
+        'idf': vectorizer.idf_,
+        'matrix.data': matrix.data,
+        'matrix.indices': matrix.indices,
+        'matrix.indptr': matrix.indptr,
+    }
+    checksums = {}
+    for name, array in arrays.items():
+        target = os.path.join(path, name + '.npy')
+        _write_replace(target, lambda f: np.save(f, np.ascontiguousarray(array)))
+        checksums[name + '.npy'] = file_sha256(target)
+
+    target = os.path.join(path, 'vocabulary.json')
+    vocabulary = {term: int(col) for term, col in vectorizer.vocabulary_.items()}
+    _write_replace(target, lambda f: json.dump(vocabulary, f), 'w')
+    checksums['vocabulary.json'] = file_sha256(target)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'key': _artifact_key(source_hash, params),
+        'source_sha256': source_hash,
+        'sklearn_version': SKLEARN_VERSION,
+        'params': params,
+        'shape': list(matrix.shape),
+        'checksums': checksums,
+    }
+    # The manifest goes last, so an interrupted build is never considered valid
+    _write_replace(os.path.join(path, 'manifest.json'), lambda f: json.dump(manifest, f, indent=2), 'w')
+
+    return vectorizer, matrix
+
+
+def verify_tfidf(path):
+    """Return the names of files whose checksum does not match the manifest."""
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    return [
+        name for name, checksum in manifest['checksums'].items()
+        if not os.path.exists(os.path.join(path, name))
+        or file_sha256(os.path.join(path, name)) != checksum
+    ]
+
+
+def open_tfidf(path):
+    """Rebuild the vectorizer and memory-map the matrix stored at ``path``."""
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    with open(os.path.join(path, 'vocabulary.json'), encoding='utf-8') as f:
+        vocabulary = json.load(f)
+
+    arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in ARRAY_FILES}
+    vectorizer = _vectorizer_from(manifest['params'], vocabulary, np.asarray(arrays['idf']))
+    matrix = sp.csr_matrix(
+        (arrays['matrix.data'], arrays['matrix.indices'], arrays['matrix.indptr']),
+        shape=tuple(manifest['shape']), copy=False,
+    )
+    return vectorizer, matrix
+
+
+def load_tfidf(name, texts, source_hash=None, artifact_dir=DEFAULT_ARTIFACT_DIR, verify=False, **params):
+    """Fitted (vectorizer, matrix) for ``texts``, from disk when the artifact is current.
+
+    ``texts`` may be a callable so the corpus is only materialized on a
+    rebuild; pass ``source_hash`` to identify the data without reading it.
+    With ``verify=True`` every file is checked against its stored SHA-256
+    before use (this reads the whole artifact).
+    """
+    if source_hash is None:
+        texts = texts() if callable(texts) else texts
+        source_hash = texts_sha256(texts)
+
+    root = os.path.join(artifact_dir, name)
+    params_json = json.loads(json.dumps(params))
+    key = _artifact_key(source_hash, params_json)
+    version = f"v{FORMAT_VERSION}-{key[:16]}"
+    path = os.path.join(root, version)
+    artifact = _open_current(path, key, verify)
+    if artifact is not None:
+        return artifact
+
+    # Worker processes starting together build it once; the others wait and reuse it
+    with file_lock(root + '.lock'):
+        artifact = _open_current(path, key, verify)
+        if artifact is not None:
+            return artifact
+        print(f"Building TF-IDF artifact {name}...")
+        texts = texts() if callable(texts) else texts
+        artifact = build_tfidf(path, texts, source_hash, params_json)
+        remove_old_versions(root, version)
+        return artifact
+
+
+def _open_current(path, key, verify):
+    """The finished artifact at ``path`` if it was built for ``key``, else None."""
+    try:
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+        current = (
+            manifest.get('format_version') == FORMAT_VERSION
+            and manifest.get('key') == key
+            and not (verify and verify_tfidf(path))
+        )
+        if current:
+            return open_tfidf(path)
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Ignoring unreadable TF-IDF artifact {path}: {e}")
+    return None
+
+
+if __name__ == "__main__":
+    # python artifacts.py [--verify]: build (or check) the artifacts used at startup
+    from hospital import HospitalMatcher
+    from specialist import SpecialistRecommender
+
+    HospitalMatcher().vectorizer
+    SpecialistRecommender()
+    if '--verify' in sys.argv[1:]:
+        for name in sorted(os.listdir(DEFAULT_ARTIFACT_DIR)):
+            root = os.path.join(DEFAULT_ARTIFACT_DIR, name)
+            if not os.path.isdir(root):
+                continue
+            for version in sorted(v for v in os.listdir(root) if v.startswith('v')):
+                bad = verify_tfidf(os.path.join(root, version))
+                print(f"{name}/{version}: {'checksum mismatch in ' + ', '.join(bad) if bad else 'ok'}")
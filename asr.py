@@ -0,0 +1,137 @@
+"""Speech-to-text backends.
+
+``google`` is speech_recognition's web API: accurate, but one network round
+trip per phrase. ``vosk`` runs a Kaldi model from disk on the CPU, works
+offline and can stream: fed audio while the user is still talking, it
+returns partial hypotheses. ``auto`` uses Google with Vosk as the fallback
+(and as the streaming engine) when a Vosk model is installed, and plain
+Google otherwise.
+
+Every backend's ``recognize`` raises ``sr.UnknownValueError`` when nothing
+was understood and ``sr.RequestError`` when the engine is unavailable, like
+``Recognizer.recognize_google``.
+"""
+import json
+import os
+
+import speech_recognition as sr
+
+BACKENDS = ('google', 'vosk', 'auto')
+
+DEFAULT_VOSK_MODEL = os.path.join(
+    os.path.expanduser('~'), '.cache', 'medchat', 'vosk', 'vosk-model-small-en-in-0.4'
+)
+
+
+class GoogleASR:
+    name = 'google'
+    streaming = False
+
+    def __init__(self, recognizer=None, language='en-US'):
+        self.recognizer = recognizer or sr.Recognizer()
+        self.language = language
+
+    def recognize(self, audio):
+        return self.recognizer.recognize_google(audio, language=self.language)
+
+
+class VoskStream:
+    """Incremental recognition of one phrase."""
+
+    def __init__(self, recognizer):
+        self._recognizer = recognizer
+        self._text = []
+
+    def accept(self, frames):
+        """Feed raw 16-bit mono audio; return the hypothesis so far."""
+        if self._recognizer.AcceptWaveform(frames):
+            # Vosk found an internal pause and finalized a segment
+            text = json.loads(self._recognizer.Result()).get('text', '')
+            if text:
+                self._text.append(text)
+            return ' '.join(self._text)
+        partial = json.loads(self._recognizer.PartialResult()).get('partial', '')
+        return ' '.join(self._text + [partial] if partial else self._text)
+
+    def result(self):
+        text = json.loads(self._recognizer.FinalResult()).get('text', '')
+        return ' '.join(self._text + [text] if text else self._text)
+
+
+class VoskASR:
+    name = 'vosk'
+    streaming = True
+
+    def __init__(self, model_path=DEFAULT_VOSK_MODEL):
+        self.model_path = model_path
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            # Loading the model takes a moment; do it on first use
+            from vosk import Model, SetLogLevel
+
+            if not os.path.isdir(self.model_path):
+                raise sr.RequestError(f"Vosk model not found at {self.model_path}")
+            SetLogLevel(-1)
+            self._model = Model(self.model_path)
+        return self._model
+
+    def stream(self, sample_rate):
+        from vosk import KaldiRecognizer
+
+        return VoskStream(KaldiRecognizer(self.model, sample_rate))
+
+    def recognize(self, audio):
+        stream = self.stream(audio.sample_rate)
+        stream.accept(audio.get_raw_data(convert_width=2))
+        text = stream.result()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class FallbackASR:
+    """Recognize with ``primary``; use ``fallback`` when it is unreachable."""
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+        self.streaming = primary.streaming or fallback.streaming
+        self.fallbacks = 0
+
+    def recognize(self, audio):
+        try:
+            return self.primary.recognize(audio)
+        except sr.RequestError as e:
+            self.fallbacks += 1
+            print(f"{self.primary.name} recognition unavailable ({e}); using {self.fallback.name}")
+            return self.fallback.recognize(audio)
+
+    def stream(self, sample_rate):
+        return (self.primary if self.primary.streaming else self.fallback).stream(sample_rate)
+
+
+def vosk_available(model_path=DEFAULT_VOSK_MODEL):
+    if not os.path.isdir(model_path):
+        return False
+    try:
+        import vosk  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def load_asr(backend='auto', recognizer=None, model_path=DEFAULT_VOSK_MODEL):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown ASR backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+    if backend == 'google':
+        return GoogleASR(recognizer)
+    if backend == 'vosk':
+        return VoskASR(model_path)
+    if vosk_available(model_path):
+        return FallbackASR(GoogleASR(recognizer), VoskASR(model_path))
+    return GoogleASR(recognizer)
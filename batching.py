@@ -0,0 +1,130 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Collects concurrent requests into batches for a single worker thread.
+
+    A batch is dispatched when it reaches ``max_batch_size`` items or when
+    ``max_wait_ms`` has passed since its first item arrived, whichever comes
+    first. Larger batches and longer waits raise throughput at the cost of
+    tail latency. ``batch_fn`` takes a list of items and returns a list of
+    results in the same order; each caller gets a ``Future`` for its own item.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=10, name='micro-batcher',
+                 latency_window=10000):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self._requests = 0
+        self._batches = 0
+        self._busy_time = 0.0
+        self._started = time.perf_counter()
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        deadline = first[2] + self.max_wait
+        # Requests whose Future was cancelled while queued are dropped here
+        batch = [first] if first[1].set_running_or_notify_cancel() else []
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Past the deadline, still take whatever is already queued
+                if remaining > 0:
+                    request = self._queue.get(timeout=remaining)
+                else:
+                    request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            if request[1].set_running_or_notify_cancel():
+                batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            if not batch:
+                continue
+            try:
+                self._process(batch)
+            except Exception as e:
+                # Keep the worker alive, or every later caller would wait forever
+                print(f"Micro-batcher error: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch):
+        start = time.perf_counter()
+        try:
+            results = self.batch_fn([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+            error = None
+        except Exception as e:
+            error = e
+        done = time.perf_counter()
+
+        for i, (_, future, submitted) in enumerate(batch):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+
+        with self._lock:
+            self._requests += len(batch)
+            self._batches += 1
+            self._busy_time += done - start
+            self._latencies.extend(done - submitted for _, _, submitted in batch)
+
+    def stats(self):
+        """Throughput and latency counters since the batcher started."""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            elapsed = time.perf_counter() - self._started
+            return {
+                'requests': self._requests,
+                'batches': self._batches,
+                'mean_batch_size': self._requests / self._batches if self._batches else 0.0,
+                'throughput_per_s': self._requests / elapsed if elapsed else 0.0,
+                'busy_fraction': self._busy_time / elapsed if elapsed else 0.0,
+                'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+            }
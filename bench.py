@@ -0,0 +1,344 @@
+"""Micro-benchmarks for the MedChat components.
+
+Usage: python bench.py <benchmark> [options]
+"""
+import argparse
+import time
+
+import numpy as np
+
+
+def synthetic_coordinates(n, seed=0):
+    """Random hospital coordinates inside India's bounding box."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(8.0, 34.0, n), rng.uniform(68.0, 97.0, n)])
+
+
+def timeit(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return np.median(timings) * 1000
+
+
+def bench_spatial(args):
+    from geo import DistanceEngine, SpatialIndex
+
+    coords = synthetic_coordinates(args.hospitals)
+    users = synthetic_coordinates(args.queries, seed=1)
+
+    start = time.perf_counter()
+    engine = DistanceEngine(coords)
+    index = SpatialIndex(engine)
+    print(f"Built index over {args.hospitals} hospitals in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def full_scan_within():
+        for user in users:
+            dist = engine.distances_from(user, radius_km=args.radius)
+            rows = np.flatnonzero(dist <= args.radius)
+            rows[np.argsort(dist[rows])]
+
+    def index_within():
+        for user in users:
+            index.within(user, args.radius)
+
+    def full_scan_nearest():
+        for user in users:
+            dist = engine.distances_from(user)
+            rows = np.argpartition(dist, args.k)[:args.k]
+            rows[np.argsort(dist[rows])]
+
+    def index_nearest():
+        for user in users:
+            index.nearest(user, args.k)
+
+    for name, fn in [
+        (f"full scan  within({args.radius} km)", full_scan_within),
+        (f"k-d tree   within({args.radius} km)", index_within),
+        (f"full scan  nearest({args.k})", full_scan_nearest),
+        (f"k-d tree   nearest({args.k})", index_nearest),
+    ]:
+        per_query = timeit(fn, args.repeat) / args.queries
+        print(f"{name:<32} {per_query:8.3f} ms/query")
+
+
+SAMPLE_UTTERANCES = [
+    "i have a headache and fever",
+    "my chest hurts and i have shortness of breath",
+    "i feel dizzy and nauseous since yesterday",
+    "there is a rash on my arm and it is swelling",
+    "back pain and joint pain when i wake up",
+    "i keep vomiting and have diarrhea",
+]
+
+
+def bench_ner_batch(args):
+    import threading
+
+    from medical import MedicalNLP
+
+    # Every request goes to the model, which is what this measures
+    nlp = MedicalNLP(batching=True, max_batch_size=args.batch_size, max_wait_ms=args.wait_ms, cascade=False)
+    nlp.extract_symptoms_batch(SAMPLE_UTTERANCES[:1])  # warm up
+
+    def session(i):
+        for j in range(args.requests):
+            nlp.extract_symptoms(SAMPLE_UTTERANCES[(i + j) % len(SAMPLE_UTTERANCES)])
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    stats = nlp.batching_stats()
+    total = args.sessions * args.requests
+    print(f"{total} requests from {args.sessions} sessions in {elapsed:.2f} s "
+          f"({total / elapsed:.1f} req/s)")
+    print(f"mean batch size {stats['mean_batch_size']:.1f}, "
+          f"p50 {stats['p50_ms']:.0f} ms, p99 {stats['p99_ms']:.0f} ms")
+
+
+def run_ner_backend(args):
+    """Load one NER backend in this process and print its timings and outputs as JSON."""
+    import json
+    import resource
+
+    from medical import MedicalNLP
+
+    start = time.perf_counter()
+    nlp = MedicalNLP(ner_backend=args.backend, quantize=args.quantize, cascade=False)
+    nlp.warm_up(background=False)
+    load_s = time.perf_counter() - start
+
+    outputs = [sorted(nlp.extract_symptoms(text)) for text in SAMPLE_UTTERANCES]
+    timings = []
+    for _ in range(args.repeat):
+        for text in SAMPLE_UTTERANCES:
+            start = time.perf_counter()
+            nlp.extract_symptoms(text)
+            timings.append(time.perf_counter() - start)
+
+    print(json.dumps({
+        'load_s': load_s,
+        'p50_ms': float(np.percentile(timings, 50) * 1000),
+        'p99_ms': float(np.percentile(timings, 99) * 1000),
+        # ru_maxrss is in KiB on Linux
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'outputs': outputs,
+    }))
+
+
+def bench_ner_backends(args):
+    """Compare NER backends for latency, peak RSS and output parity with PyTorch.
+
+    Each backend runs in a fresh interpreter so RSS is not shared between
+    them. Exits non-zero when the ONNX symptoms disagree with the PyTorch
+    path on more than ``--max-mismatch`` of the sample utterances
+    (``--max-int8-mismatch`` for the quantized model).
+    """
+    import json
+    import subprocess
+    import sys
+
+    configs = [('torch', False), ('onnx', False), ('onnx', True)]
+    results = {}
+    for backend, quantize in configs:
+        command = [sys.executable, __file__, 'ner-backend-run', '--backend', backend,
+                   '--repeat', str(args.repeat)] + (['--quantize'] if quantize else [])
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        results[(backend, quantize)] = json.loads(output.strip().splitlines()[-1])
+
+    reference = results[('torch', False)]['outputs']
+    failed = False
+    print(f"{'backend':<12} {'load s':>7} {'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>8} {'parity':>7}")
+    for (backend, quantize), result in results.items():
+        matches = sum(a == b for a, b in zip(result['outputs'], reference))
+        parity = matches / len(reference)
+        failed |= parity < 1 - (args.max_int8_mismatch if quantize else args.max_mismatch)
+        name = backend + (' int8' if quantize else '')
+        print(f"{name:<12} {result['load_s']:7.1f} {result['p50_ms']:8.1f} {result['p99_ms']:8.1f} "
+              f"{result['max_rss_mb']:8.0f} {parity:7.0%}")
+
+    if failed:
+        print("Parity check failed: too many utterances differ from the torch backend")
+        sys.exit(1)
+
+
+HOSPITAL_ONLY_SNIPPET = """
+import time
+start = time.perf_counter()
+from hospital import HospitalMatcher
+matcher = HospitalMatcher()
+matcher.find_emergency_hospitals((28.6139, 77.2090))
+matcher.find_hospitals_by_insurance('Star Health', (19.0760, 72.8777))
+print(f"cold_start_ms={(time.perf_counter() - start) * 1000:.1f}")
+"""
+
+# Modules a hospital-only lookup must never pull in
+HEAVY_MODULES = ('transformers', 'torch', 'sklearn', 'pygame', 'speech_recognition', 'gtts', 'pyttsx3')
+
+
+def bench_importtime(args):
+    """Import-time budget for HospitalMatcher-only usage, measured with ``-X importtime``.
+
+    Exits non-zero if the cold start exceeds ``--budget-ms`` or any heavy
+    dependency is imported on the hospital-only path.
+    """
+    import subprocess
+    import sys
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', HOSPITAL_ONLY_SNIPPET],
+        capture_output=True, text=True, check=True,
+    )
+    cold_start_ms = float(result.stdout.strip().rsplit('=', 1)[-1])
+
+    top_level = []
+    second_level = []
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|')
+        name = name[1:]  # nesting depth is the indentation after one separator space
+        imported.add(name.strip().split('.')[0])
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        entry = (int(cumulative_us) / 1000, name.strip())
+        if depth == 0:
+            top_level.append(entry)
+        elif depth == 1:
+            second_level.append(entry)
+
+    import_ms = sum(ms for ms, _ in top_level)
+    print(f"cold start {cold_start_ms:.0f} ms, of which imports {import_ms:.0f} ms "
+          f"(budget {args.budget_ms:.0f} ms)")
+    for ms, name in sorted(top_level + second_level, reverse=True)[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    heavy = sorted(imported.intersection(HEAVY_MODULES))
+    failed = False
+    if heavy:
+        print(f"FAIL: hospital-only path imported {', '.join(heavy)}")
+        failed = True
+    if cold_start_ms > args.budget_ms:
+        print(f"FAIL: cold start {cold_start_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+def bench_service_load(args):
+    """Load-test the HTTP triage service with concurrent clients.
+
+    Without ``--url`` a service is started in this process on a free port.
+    """
+    import json
+    import threading
+    import urllib.error
+    import urllib.request
+    from collections import Counter
+
+    url = args.url
+    if url is None:
+        from service import TriageServer
+
+        server = TriageServer(('127.0.0.1', 0), max_concurrency=args.max_concurrency)
+        server.warm_up()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    cities = ['delhi', 'mumbai', 'bangalore', 'chennai', 'kolkata']
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def client(i):
+        for j in range(args.requests):
+            body = {'text': SAMPLE_UTTERANCES[(i + j) % len(SAMPLE_UTTERANCES)], 'city': cities[(i + j) % len(cities)]}
+            request = urllib.request.Request(
+                f"{url}/{args.endpoint}", data=json.dumps(body).encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+            )
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except OSError:
+                status = 'error'
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                statuses[status] += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = args.concurrency * args.requests
+    print(f"{total} /{args.endpoint} requests from {args.concurrency} clients in {elapsed:.2f} s "
+          f"({total / elapsed:.1f} req/s)")
+    print(f"p50 {np.percentile(latencies, 50) * 1000:.1f} ms, p99 {np.percentile(latencies, 99) * 1000:.1f} ms, "
+          f"status {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    spatial = commands.add_parser('spatial', help="spatial index vs full scan location queries")
+    spatial.add_argument('--hospitals', type=int, default=50000)
+    spatial.add_argument('--queries', type=int, default=200)
+    spatial.add_argument('--radius', type=float, default=50.0)
+    spatial.add_argument('-k', type=int, default=5)
+    spatial.add_argument('--repeat', type=int, default=5)
+    spatial.set_defaults(func=bench_spatial)
+
+    ner_batch = commands.add_parser('ner-batch', help='micro-batched NER under concurrent sessions')
+    ner_batch.add_argument('--sessions', type=int, default=16)
+    ner_batch.add_argument('--requests', type=int, default=10)
+    ner_batch.add_argument('--batch-size', type=int, default=16)
+    ner_batch.add_argument('--wait-ms', type=float, default=10)
+    ner_batch.set_defaults(func=bench_ner_batch)
+
+    ner_backends = commands.add_parser('ner-backends', help='torch vs ONNX NER latency, RSS and parity')
+    ner_backends.add_argument('--repeat', type=int, default=20)
+    ner_backends.add_argument('--max-mismatch', type=float, default=0.0)
+    ner_backends.add_argument('--max-int8-mismatch', type=float, default=0.2)
+    ner_backends.set_defaults(func=bench_ner_backends)
+
+    ner_backend_run = commands.add_parser('ner-backend-run')
+    ner_backend_run.add_argument('--backend', default='torch')
+    ner_backend_run.add_argument('--quantize', action='store_true')
+    ner_backend_run.add_argument('--repeat', type=int, default=20)
+    ner_backend_run.set_defaults(func=run_ner_backend)
+
+    importtime = commands.add_parser('importtime', help='import-time budget for hospital-only usage')
+    importtime.add_argument('--budget-ms', type=float, default=1500)
+    importtime.add_argument('--top', type=int, default=10)
+    importtime.set_defaults(func=bench_importtime)
+
+    service_load = commands.add_parser('service-load', help='concurrent clients against the HTTP triage service')
+    service_load.add_argument('--url', help='running service; default starts one in-process')
+    service_load.add_argument('--endpoint', default='triage', choices=['symptoms', 'specialist', 'triage'])
+    service_load.add_argument('--concurrency', type=int, default=16)
+    service_load.add_argument('--requests', type=int, default=20)
+    service_load.add_argument('--max-concurrency', type=int, default=8)
+    service_load.set_defaults(func=bench_service_load)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Known cities and their coordinates, for locations given by voice."""
+import re
+
+CITY_COORDINATES = {
+    'delhi': (28.6139, 77.2090),
+    'new delhi': (28.6139, 77.2090),
+    'mumbai': (19.0760, 72.8777),
+    'bangalore': (12.9716, 77.5946),
+    'bengaluru': (12.9716, 77.5946),
+    'chennai': (13.0827, 80.2707),
+    'kolkata': (22.5726, 88.3639),
+    'hyderabad': (17.3850, 78.4867),
+    'pune': (18.5204, 73.8567),
+    'ahmedabad': (23.0225, 72.5714),
+    'jaipur': (26.9124, 75.7873),
+    'lucknow': (26.8467, 80.9462),
+    'chandigarh': (30.7333, 76.7794),
+    'gurgaon': (28.4595, 77.0266),
+    'gurugram': (28.4595, 77.0266),
+    'noida': (28.5355, 77.3910),
+    'ghaziabad': (28.6692, 77.4538),
+    'faridabad': (28.4089, 77.3178),
+    'indore': (22.7196, 75.8577),
+    'bhopal': (23.2599, 77.4126),
+    'patna': (25.5941, 85.1376),
+    'nagpur': (21.1458, 79.0882),
+    'surat': (21.1702, 72.8311),
+    'vadodara': (22.3072, 73.1812),
+    'rajkot': (22.3039, 70.8022),
+    'coimbatore': (11.0168, 76.9558),
+    'madurai': (9.9252, 78.1198),
+    'kochi': (9.9312, 76.2673),
+    'thiruvananthapuram': (8.5241, 76.9366),
+    'visakhapatnam': (17.6868, 83.2185),
+    'vijayawada': (16.5062, 80.6480),
+    'bhubaneswar': (20.2961, 85.8245),
+    'raipur': (21.2514, 81.6296),
+    'ranchi': (23.3441, 85.3096),
+    'dehradun': (30.3165, 78.0322),
+    'shimla': (31.1048, 77.1734),
+    'jammu': (32.7266, 74.8570),
+    'srinagar': (34.0837, 74.7973),
+    'guwahati': (26.1445, 91.7362),
+    'agartala': (23.8315, 91.2868)
+}
+
+
+# Longest first, so "new delhi" wins over "delhi"; whole words only
+_CITY_NAMES = '|'.join(re.escape(c) for c in sorted(CITY_COORDINATES, key=len, reverse=True))
+_CITY_PATTERN = re.compile(rf'\b(?:{_CITY_NAMES})\b')
+_CITY_MENTION_PATTERN = re.compile(rf'\b(?:in|at|near|around|from)\s+(?:the\s+)?({_CITY_NAMES})\b')
+
+
+def find_city(text):
+    """(city, coordinates) of the first known city named in ``text``, or None."""
+    match = _CITY_PATTERN.search(text.lower())
+    if match is None:
+        return None
+    return match.group(0), CITY_COORDINATES[match.group(0)]
+
+
+def find_city_mention(text):
+    """Like ``find_city``, but only for a city given as a location ("in Pune", "near Delhi")."""
+    match = _CITY_MENTION_PATTERN.search(text.lower())
+    if match is None:
+        return None
+    return match.group(1), CITY_COORDINATES[match.group(1)]
@@ -0,0 +1,112 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Worst-case relative error of the spherical haversine against the WGS-84
+# ellipsoid used by geopy's geodesic.
+HAVERSINE_MAX_REL_ERROR = 0.0056
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments are in radians and broadcast."""
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class DistanceEngine:
+    """Vectorized distances from users to a fixed set of coordinates."""
+
+    def __init__(self, coordinates):
+        self.coordinates = np.asarray(
+            [tuple(c) for c in coordinates], dtype=np.float64
+        ).reshape(-1, 2)
+        self.lat_rad = np.radians(self.coordinates[:, 0])
+        self.lon_rad = np.radians(self.coordinates[:, 1])
+
+    def __len__(self):
+        return len(self.coordinates)
+
+    def distances(self, users):
+        """Return an (N, M) matrix of km distances for (N, 2) user coordinates."""
+        users = np.radians(np.asarray(users, dtype=np.float64).reshape(-1, 2))
+        return haversine_km(
+            users[:, :1], users[:, 1:], self.lat_rad[None, :], self.lon_rad[None, :]
+        )
+
+    def distances_from(self, user_location, rows=None, radius_km=None, precise=False):
+        """Distances in km from one user to ``rows`` (all rows by default).
+
+        With ``precise=True`` every distance is computed with geopy's geodesic.
+        With ``radius_km`` set, rows whose haversine distance is close enough
+        to the radius that the spherical error could flip a ``<= radius_km``
+        test are recomputed with geodesic, so filtering matches the
+        ellipsoidal result.
+        """
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.intp)
+        lat, lon = np.radians(np.asarray(user_location, dtype=np.float64))
+        dist = haversine_km(lat, lon, self.lat_rad[rows], self.lon_rad[rows])
+
+        if precise:
+            refine = np.arange(len(rows))
+        elif radius_km is not None:
+            refine = np.flatnonzero(
+                np.abs(dist - radius_km) <= radius_km * HAVERSINE_MAX_REL_ERROR
+            )
+        else:
+            refine = ()
+
+        if len(refine):
+            from geopy.distance import geodesic
+
+        for i in refine:
+            dist[i] = geodesic(tuple(user_location), tuple(self.coordinates[rows[i]])).kilometers
+
+        return dist
+
+
+def unit_vectors(lat_rad, lon_rad):
+    """Points on the unit sphere for latitudes and longitudes in radians."""
+    cos_lat = np.cos(lat_rad)
+    return np.column_stack([cos_lat * np.cos(lon_rad), cos_lat * np.sin(lon_rad), np.sin(lat_rad)])
+
+
+class SpatialIndex:
+    """k-d tree over unit-sphere coordinates for k-nearest and radius queries.
+
+    Chord length on the unit sphere grows monotonically with great-circle
+    distance, so Euclidean neighbours in 3-D are great-circle neighbours.
+    """
+
+    def __init__(self, engine, leafsize=16):
+        self.engine = engine
+        self.tree = cKDTree(unit_vectors(engine.lat_rad, engine.lon_rad), leafsize=leafsize)
+
+    def _point(self, user_location):
+        lat, lon = np.radians(np.asarray(user_location, dtype=np.float64))
+        return unit_vectors(np.array([lat]), np.array([lon]))[0]
+
+    def nearest(self, user_location, k=5, precise=False):
+        """Return (rows, distances_km) of the ``k`` closest rows, nearest first."""
+        k = min(k, len(self.engine))
+        if k == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        _, rows = self.tree.query(self._point(user_location), k=k)
+        rows = np.atleast_1d(rows)
+        dist = self.engine.distances_from(user_location, rows, precise=precise)
+        order = np.argsort(dist, kind='stable')
+        return rows[order], dist[order]
+
+    def within(self, user_location, radius_km, precise=False):
+        """Return (rows, distances_km) of rows within ``radius_km``, nearest first."""
+        # Over-fetch by the haversine error bound; the engine settles the boundary.
+        angle = min(radius_km * (1 + HAVERSINE_MAX_REL_ERROR) / EARTH_RADIUS_KM, np.pi)
+        chord = 2 * np.sin(angle / 2)
+        rows = np.asarray(self.tree.query_ball_point(self._point(user_location), chord), dtype=np.intp)
+        dist = self.engine.distances_from(user_location, rows, radius_km=radius_km, precise=precise)
+        keep = dist <= radius_km
+        rows, dist = rows[keep], dist[keep]
+        order = np.argsort(dist, kind='stable')
+        return rows[order], dist[order]
@@ -1,263 +1,212 @@
-import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from geopy.distance import geodesic
 import random
+import threading
+from collections import OrderedDict
+
+from artifacts import load_tfidf
+from cities import find_city
+from geo import DistanceEngine, SpatialIndex
+from postings import PostingIndex
+from ranking import top_k
+from registry import HospitalRegistry
 
 class HospitalMatcher:
-    def __init__(self):
-        self.hospital_data = self.create_hospital_database()
-        self.vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2))
-        self.specialty_vectors = self.vectorizer.fit_transform(
-            self.hospital_data['specialties_text']
+    def __init__(self, precise_distances=False, registry=None):
+        # Columns are memory-mapped and only read when an index or query needs them
+        self.registry = registry if registry is not None else HospitalRegistry.from_source()
+        self._hospital_data = None
+        self.precise_distances = precise_distances
+        self.distance_engine = DistanceEngine(self.registry.column('coordinates'))
+        self.spatial_index = SpatialIndex(self.distance_engine)
+        
+        n_rows = len(self.registry)
+        insurance = self.registry.column('insurance')
+        self.insurance_index = PostingIndex.from_codes(
+            insurance.codes, insurance.vocabulary, n_rows, insurance.row_ids()
+        )
+        hospital_type = self.registry.column('type')
+        self.type_index = PostingIndex.from_codes(hospital_type.codes, hospital_type.vocabulary, n_rows)
+        self.emergency_index = PostingIndex.from_codes(
+            self.registry.column('emergency').astype(np.int8), [False, True], n_rows
         )
         
+        # Specialty TF-IDF (and scikit-learn) is only loaded for specialty queries
+        self._specialty_tfidf = None
+        self._specialty_lock = threading.Lock()
+        # Full-registry similarity vectors of recently queried specialties
+        self._specialty_score_cache = OrderedDict()
+        self._score_cache_lock = threading.Lock()
+    
+    def _load_specialty_tfidf(self):
+        with self._specialty_lock:
+            if self._specialty_tfidf is None:
+                # Fitted once per registry version and memory-mapped afterwards
+                self._specialty_tfidf = load_tfidf(
+                    'hospital_specialties',
+                    lambda: self.registry.column('specialties').joined(' '),
+                    source_hash=self.registry.manifest.get('source_sha256'),
+                    stop_words='english', ngram_range=(1, 2),
+                )
+        return self._specialty_tfidf
+    
+    @property
+    def vectorizer(self):
+        return (self._specialty_tfidf or self._load_specialty_tfidf())[0]
+    
+    @property
+    def specialty_vectors(self):
+        return (self._specialty_tfidf or self._load_specialty_tfidf())[1]
+    
+    @property
+    def hospital_data(self):
+        """Full registry as a DataFrame, materialized on first access"""
+        if self._hospital_data is None:
+            self._hospital_data = self.create_hospital_database()
+        return self._hospital_data
+    
     def create_hospital_database(self):
-        hospitals = [
-            {
-                'name': 'All India Institute of Medical Sciences (AIIMS)',
-                'location': 'New Delhi',
-                'coordinates': (28.6139, 77.2090),
-                'specialties': ['cardiology', 'neurology', 'oncology', 'orthopedics', 'gastroenterology', 'nephrology'],
-                'rating': 4.8,
-                'emergency': True,
-                'insurance': ['Government', 'CGHS', 'ECHS', 'ESI', 'Private'],
-                'phone': '011-26588500',
-                'type': 'Government'
-            },
-            {
-                'name': 'Apollo Hospitals',
-                'location': 'Chennai',
-                'coordinates': (13.0827, 80.2707),
-                'specialties': ['cardiology', 'oncology', 'neurology', 'orthopedics', 'transplant', 'emergency medicine'],
-                'rating': 4.6,
-                'emergency': True,
-                'insurance': ['Star Health', 'HDFC ERGO', 'ICICI Lombard', 'Bajaj Allianz', 'New India Assurance'],
-                'phone': '044-28293333',
-                'type': 'Private'
-            },
-            {
-                'name': 'Fortis Healthcare',
-                'location': 'Gurgaon',
-                'coordinates': (28.4595, 77.0266),
-                'specialties': ['cardiology', 'neurology', 'oncology', 'orthopedics', 'gastroenterology', 'urology'],
-                'rating': 4.4,
-                'emergency': True,
-                'insurance': ['Star Health', 'Max Bupa', 'HDFC ERGO', 'Religare', 'Apollo Munich'],
-                'phone': '0124-4962200',
-                'type': 'Private'
-            },
-            {
-                'name': 'Medanta - The Medicity',
-                'location': 'Gurgaon',
-                'coordinates': (28.4089, 77.0416),
-                'specialties': ['cardiology', 'neurology', 'oncology', 'transplant', 'pediatrics', 'emergency medicine'],
-                'rating': 4.5,
-                'emergency': True,
-                'insurance': ['Star Health', 'Care Health', 'HDFC ERGO', 'ICICI Lombard', 'United India'],
-                'phone': '0124-4141414',
-                'type': 'Private'
-            },
-            {
-                'name': 'Manipal Hospitals',
-                'location': 'Bangalore',
-                'coordinates': (12.9716, 77.5946),
-                'specialties': ['cardiology', 'neurology', 'oncology', 'orthopedics', 'gastroenterology', 'nephrology'],
-                'rating': 4.3,
-                'emergency': True,
-                'insurance': ['Star Health', 'Bajaj Allianz', 'HDFC ERGO', 'Max Bupa', 'Religare'],
-                'phone': '080-25023200',
-                'type': 'Private'
-            },
-            {
-                'name': 'Max Super Speciality Hospital',
-                'location': 'Delhi',
-                'coordinates': (28.5355, 77.2910),
-                'specialties': ['cardiology', 'neurology', 'oncology', 'orthopedics', 'emergency medicine', 'dermatology'],
-                'rating': 4.2,
-                'emergency': True,
-                'insurance': ['Max Bupa', 'Star Health', 'HDFC ERGO', 'Care Health', 'ICICI Lombard'],
-                'phone': '011-26692251',
-                'type': 'Private'
-            },
-            {
-                'name': 'Tata Memorial Hospital',
-                'location': 'Mumbai',
-                'coordinates': (19.0760, 72.8777),
-                'specialties': ['oncology', 'radiation oncology', 'surgical oncology', 'medical oncology', 'palliative care'],
-                'rating': 4.7,
-                'emergency': True,
-                'insurance': ['Government', 'CGHS', 'ESI', 'Star Health', 'HDFC ERGO'],
-                'phone': '022-24177000',
-                'type': 'Government'
-            },
-            {
-                'name': 'King George Medical University',
-                'location': 'Lucknow',
-                'coordinates': (26.9124, 80.9424),
-                'specialties': ['cardiology', 'neurology', 'gastroenterology', 'orthopedics', 'pediatrics', 'emergency medicine'],
-                'rating': 4.1,
-                'emergency': True,
-                'insurance': ['Government', 'CGHS', 'ESI', 'UP State Insurance'],
-                'phone': '0522-2258401',
-                'type': 'Government'
-            },
-            {
-                'name': 'Christian Medical College (CMC)',
-                'location': 'Vellore',
-                'coordinates': (12.9165, 79.1325),
-                'specialties': ['cardiology', 'neurology', 'oncology', 'nephrology', 'gastroenterology', 'transplant'],
-                'rating': 4.6,
-                'emergency': True,
-                'insurance': ['Government', 'Star Health', 'HDFC ERGO', 'New India Assurance'],
-                'phone': '0416-2282020',
-                'type': 'Private'
-            },
-            {
-                'name': 'Narayana Health',
-                'location': 'Bangalore',
-                'coordinates': (12.9079, 77.6101),
-                'specialties': ['cardiology', 'cardiac surgery', 'neurology', 'oncology', 'orthopedics', 'pediatrics'],
-                'rating': 4.4,
-                'emergency': True,
-                'insurance': ['Star Health', 'HDFC ERGO', 'Bajaj Allianz', 'Care Health', 'ICICI Lombard'],
-                'phone': '080-71222222',
-                'type': 'Private'
-            },
-            {
-                'name': 'PGIMER',
-                'location': 'Chandigarh',
-                'coordinates': (30.7333, 76.7794),
-                'specialties': ['cardiology', 'neurology', 'gastroenterology', 'nephrology', 'orthopedics', 'emergency medicine'],
-                'rating': 4.5,
-                'emergency': True,
-                'insurance': ['Government', 'CGHS', 'ESI', 'Punjab State Insurance'],
-                'phone': '0172-2755555',
-                'type': 'Government'
-            },
-            {
-                'name': 'Kokilaben Dhirubhai Ambani Hospital',
-                'location': 'Mumbai',
-                'coordinates': (19.1136, 72.8697),
-                'specialties': ['cardiology', 'neurology', 'oncology', 'transplant', 'robotic surgery', 'emergency medicine'],
-                'rating': 4.3,
-                'emergency': True,
-                'insurance': ['Star Health', 'HDFC ERGO', 'ICICI Lombard', 'Bajaj Allianz', 'Care Health'],
-                'phone': '022-30999999',
-                'type': 'Private'
-            }
-        ]
+        return self.registry.to_frame()
+    
+    def distances_from(self, user_location, rows, max_distance=None):
+        return self.distance_engine.distances_from(
+            user_location, rows, radius_km=max_distance, precise=self.precise_distances
+        )
+    
+    def specialty_scores(self, required_specialty, rows=None):
+        """Cosine similarity of ``required_specialty`` to each hospital in ``rows``"""
+        with self._score_cache_lock:
+            scores = self._specialty_score_cache.get(required_specialty)
+        if scores is not None:
+            return scores if rows is None else scores[rows]
         
-        df = pd.DataFrame(hospitals)
-        df['specialties_text'] = df['specialties'].apply(lambda x: ' '.join(x))
-        df['insurance_text'] = df['insurance'].apply(lambda x: ' '.join(x))
+        # TF-IDF rows are L2-normalized, so the dot product is the cosine similarity
+        query_vector = self.vectorizer.transform([required_specialty])
+        vectors = self.specialty_vectors if rows is None else self.specialty_vectors[rows]
+        return (vectors @ query_vector.T).toarray().ravel()
+    
+    def prefetch_specialty(self, required_specialty, max_cached=32):
+        """Score every hospital for ``required_specialty`` ahead of the query that needs it
         
-        return df
+        Later specialty searches only slice the cached vector, whatever the location.
+        """
+        scores = self.specialty_scores(required_specialty)
+        scores.setflags(write=False)
+        with self._score_cache_lock:
+            self._specialty_score_cache[required_specialty] = scores
+            self._specialty_score_cache.move_to_end(required_specialty)
+            while len(self._specialty_score_cache) > max_cached:
+                self._specialty_score_cache.popitem(last=False)
+        return scores
     
-    def find_hospitals_by_cashless(self, insurance_provider):
-        cashless_hospitals = self.hospital_data[
-            self.hospital_data['insurance'].apply(
-                lambda x: insurance_provider.lower() in [ins.lower() for ins in x]
-            )
-        ].copy()
+    def build_results(self, rows, **columns):
+        """Materialize the final ``rows`` as a DataFrame with extra score columns"""
+        results = self.registry.to_frame(rows)
+        for name, values in columns.items():
+            results[name] = values
+        return results
+    
+    def find_hospitals_by_cashless(self, insurance_provider, limit=None):
+        rows = self.insurance_index.rows(insurance_provider)
+        order = top_k(self.registry.column('rating')[rows], limit)
         
-        return cashless_hospitals.sort_values('rating', ascending=False)
+        return self.build_results(rows[order])
     
-    def find_government_hospitals(self, user_location=None, max_distance=100):
-        govt_hospitals = self.hospital_data[self.hospital_data['type'] == 'Government'].copy()
+    def find_government_hospitals(self, user_location=None, max_distance=100, limit=None):
+        govt_mask = self.type_index.mask('Government')
         
         if user_location:
-            def calculate_distance(row):
-                return geodesic(user_location, row['coordinates']).kilometers
-            
-            govt_hospitals['distance_km'] = govt_hospitals.apply(calculate_distance, axis=1)
-            govt_hospitals = govt_hospitals[govt_hospitals['distance_km'] <= max_distance]
-            govt_hospitals = govt_hospitals.sort_values('distance_km')
+            rows, distances = self.spatial_index.within(
+                user_location, max_distance, precise=self.precise_distances
+            )
+            keep = govt_mask[rows]
+            rows, distances = rows[keep][:limit], distances[keep][:limit]
+            return self.build_results(rows, distance_km=distances)
         
-        return govt_hospitals
+        return self.build_results(np.flatnonzero(govt_mask)[:limit])
     
-    def find_hospitals_by_specialty(self, required_specialty, user_location=None, max_distance=50):
-        query_vector = self.vectorizer.transform([required_specialty])
-        
-        similarities = cosine_similarity(query_vector, self.specialty_vectors)[0]
-        
-        df_with_scores = self.hospital_data.copy()
-        df_with_scores['specialty_match_score'] = similarities
+    def find_hospitals_by_specialty(self, required_specialty, user_location=None, max_distance=50,
+                                    candidates=None, limit=None):
+        """Rank hospitals by specialty match; ``candidates`` is an optional row bitmap"""
+        if user_location:
+            # Only score hospitals inside the search radius
+            rows, distances = self.spatial_index.within(
+                user_location, max_distance, precise=self.precise_distances
+            )
+            if candidates is not None:
+                keep = candidates[rows]
+                rows, distances = rows[keep], distances[keep]
+        else:
+            rows = None if candidates is None else np.flatnonzero(candidates)
         
-        filtered_hospitals = df_with_scores[df_with_scores['specialty_match_score'] > 0.1]
+        similarities = self.specialty_scores(required_specialty, rows)
+        matched = np.flatnonzero(similarities > 0.1)
+        rows = matched if rows is None else rows[matched]
+        similarities = similarities[matched]
         
         if user_location:
-            def calculate_distance(row):
-                return geodesic(user_location, row['coordinates']).kilometers
-            
-            filtered_hospitals = filtered_hospitals.copy()
-            filtered_hospitals['distance_km'] = filtered_hospitals.apply(calculate_distance, axis=1)
-            
-            filtered_hospitals = filtered_hospitals[filtered_hospitals['distance_km'] <= max_distance]
-            
+            distances = distances[matched]
             # Sort by combined score (specialty match + distance factor)
-            filtered_hospitals['combined_score'] = (
-                filtered_hospitals['specialty_match_score'] * 0.7 + 
-                (1 - filtered_hospitals['distance_km'] / max_distance) * 0.3
+            combined = similarities * 0.7 + (1 - distances / max_distance) * 0.3
+            order = top_k(combined, limit)
+            return self.build_results(
+                rows[order],
+                specialty_match_score=similarities[order],
+                distance_km=distances[order],
+                combined_score=combined[order],
             )
-            filtered_hospitals = filtered_hospitals.sort_values('combined_score', ascending=False)
-        else:
-            # Sort by specialty match score only
-            filtered_hospitals = filtered_hospitals.sort_values('specialty_match_score', ascending=False)
         
-        return filtered_hospitals
+        # Sort by specialty match score only
+        order = top_k(similarities, limit)
+        return self.build_results(rows[order], specialty_match_score=similarities[order])
     
-    def find_hospitals_by_insurance(self, insurance_provider, user_location=None):
-        matching_hospitals = self.hospital_data[
-            self.hospital_data['insurance'].apply(
-                lambda x: insurance_provider.lower() in [ins.lower() for ins in x]
-            )
-        ].copy()
+    def find_hospitals_by_insurance(self, insurance_provider, user_location=None, limit=None):
+        rows = self.insurance_index.rows(insurance_provider)
         
         if user_location:
-            def calculate_distance(row):
-                return geodesic(user_location, row['coordinates']).kilometers
-            
-            matching_hospitals['distance_km'] = matching_hospitals.apply(calculate_distance, axis=1)
-            matching_hospitals = matching_hospitals.sort_values('distance_km')
+            distances = self.distances_from(user_location, rows)
+            order = top_k(distances, limit, descending=False)
+            return self.build_results(rows[order], distance_km=distances[order])
         
-        return matching_hospitals
+        return self.build_results(rows[:limit])
     
-    def find_emergency_hospitals(self, user_location, max_distance=50):
+    def find_emergency_hospitals(self, user_location, max_distance=50, candidates=None, limit=None):
         """Find nearby emergency hospitals"""
-        emergency_hospitals = self.hospital_data[self.hospital_data['emergency'] == True].copy()
+        emergency_mask = self.emergency_index.mask(True)
+        if candidates is not None:
+            emergency_mask = emergency_mask & candidates
         
         if user_location:
-            def calculate_distance(row):
-                return geodesic(user_location, row['coordinates']).kilometers
-            
-            emergency_hospitals['distance_km'] = emergency_hospitals.apply(calculate_distance, axis=1)
-            emergency_hospitals = emergency_hospitals[emergency_hospitals['distance_km'] <= max_distance]
-            emergency_hospitals = emergency_hospitals.sort_values('distance_km')
+            # Rows come back nearest first, so the first ``limit`` are the top-k
+            rows, distances = self.spatial_index.within(
+                user_location, max_distance, precise=self.precise_distances
+            )
+            keep = emergency_mask[rows]
+            return self.build_results(rows[keep][:limit], distance_km=distances[keep][:limit])
         
-        return emergency_hospitals
+        return self.build_results(np.flatnonzero(emergency_mask)[:limit])
     
     def get_comprehensive_recommendation(self, specialty, user_location=None, insurance=None, emergency=False):
-        if emergency:
-            hospitals = self.find_emergency_hospitals(user_location)
-        else:
-            hospitals = self.find_hospitals_by_specialty(specialty, user_location)
-        
-        if insurance:
-            hospitals = hospitals[
-                hospitals['insurance'].apply(
-                    lambda x: insurance.lower() in [ins.lower() for ins in x]
-                )
-            ]
+        candidates = self.insurance_index.mask(insurance) if insurance else None
         
-        return hospitals.head(5)  # Return top 5 matches
+        # Return top 5 matches
+        if emergency:
+            return self.find_emergency_hospitals(user_location, candidates=candidates, limit=5)
+        return self.find_hospitals_by_specialty(specialty, user_location, candidates=candidates, limit=5)
 
 class HospitalVoiceInterface:
     def __init__(self, hospital_matcher, voice_processor):
-        self.hospital_matcher = hospital_matcher
+        # None looks up the shared matcher on each use, following hot reloads
+        self._hospital_matcher = hospital_matcher
         self.voice_processor = voice_processor
     
+    @property
+    def hospital_matcher(self):
+        if self._hospital_matcher is not None:
+            return self._hospital_matcher
+        from resources import get_hospital_matcher
+        
+        return get_hospital_matcher()
+    
     def provide_hospital_guidance(self, hospitals_df):
         if hospitals_df.empty:
             response = "I'm sorry, I couldn't find any hospitals matching your criteria. Please try adjusting your search parameters."
@@ -294,26 +243,9 @@ class HospitalVoiceInterface:
         user_location = None
         
         if "skip" not in location_input.lower():
-            city_coordinates = {
-                'delhi': (28.6139, 77.2090),
-                'mumbai': (19.0760, 72.8777),
-                'bangalore': (12.9716, 77.5946),
-                'chennai': (13.0827, 80.2707),
-                'kolkata': (22.5726, 88.3639),
-                'hyderabad': (17.3850, 78.4867),
-                'pune': (18.5204, 73.8567),
-                'ahmedabad': (23.0225, 72.5714),
-                'jaipur': (26.9124, 75.7873),
-                'lucknow': (26.8467, 80.9462),
-                'chandigarh': (30.7333, 76.7794),
-                'gurgaon': (28.4595, 77.0266),
-                'noida': (28.5355, 77.3910)
-            }
-            
-            for city, coords in city_coordinates.items():
-                if city in location_input.lower():
-                    user_location = coords
-                    break
+            found = find_city(location_input)
+            if found is not None:
+                user_location = found[1]
         
         self.voice_processor.speak_response("Do you have health insurance? Say the name like Star Health, HDFC ERGO, or say 'government' for government schemes, or 'skip' if not applicable.")
         insurance_input = self.voice_processor.listen_to_speech()
@@ -328,7 +260,7 @@ class HospitalVoiceInterface:
         )
         
         guidance = self.provide_hospital_guidance(hospitals)
-        self.voice_processor.speak_response(guidance)
+        self.voice_processor.speak_streaming(guidance)
         
         return hospitals
 
@@ -0,0 +1,148 @@
+"""Aho-Corasick matcher for symptom terms.
+
+The lexicon is compiled into an automaton once and pickled next to the
+source file, keyed by the file's hash, so later processes load it without
+rebuilding. Matching is a single pass over the text regardless of how many
+terms the lexicon holds.
+"""
+import hashlib
+import os
+import pickle
+import re
+from collections import deque
+
+AUTOMATON_VERSION = 1
+
+DEFAULT_LEXICON = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'symptom_lexicon.tsv')
+
+# Words that carry no symptom information and don't count against coverage
+FILLER_WORDS = frozenset('''
+    a about also am an and any are as at bad be been bit but by day days do doctor feel feeling
+    for from get getting got had has have having he her his i i'm im in is it it's keep keeps
+    last little lot me morning much my night not now of off on or really she since so some
+    still than that the them then there they this today too very was week when with yesterday
+    you
+'''.split())
+
+_WORD = re.compile(r"[a-z][a-z']*")
+
+
+def read_lexicon(path):
+    """Parse ``term<TAB>canonical`` lines into a {term: canonical} dict."""
+    terms = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            term, _, canonical = line.partition('\t')
+            term = ' '.join(term.lower().split())
+            terms[term] = canonical.strip() or term
+    return terms
+
+
+class SymptomLexicon:
+    def __init__(self, terms):
+        """Compile a {term: canonical name} mapping into an automaton."""
+        # State 0 is the root; goto[state] maps a character to the next state
+        self.goto = [{}]
+        self.fail = [0]
+        # output[state] lists (term length, canonical) for terms ending here
+        self.output = [[]]
+
+        for term, canonical in terms.items():
+            state = 0
+            for char in term:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append((len(term), canonical))
+
+        # Breadth-first pass to set failure links and merge suffix outputs
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self.goto[state].items():
+                pending.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    @classmethod
+    def load(cls, path=DEFAULT_LEXICON, cache_path=None):
+        """Load the compiled automaton for ``path``, compiling and caching it if stale."""
+        cache_path = cache_path or os.path.splitext(path)[0] + '.automaton.pkl'
+        with open(path, 'rb') as f:
+            source_hash = hashlib.sha256(f.read()).hexdigest()
+
+        try:
+            with open(cache_path, 'rb') as f:
+                version, cached_hash, lexicon = pickle.load(f)
+            if version == AUTOMATON_VERSION and cached_hash == source_hash:
+                lexicon.source_hash = source_hash
+                return lexicon
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            pass
+
+        lexicon = cls(read_lexicon(path))
+        lexicon.source_hash = source_hash
+        try:
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((AUTOMATON_VERSION, source_hash, lexicon), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Could not cache symptom lexicon: {e}")
+        return lexicon
+
+    def find_all(self, text):
+        """Every lexicon term in ``text`` on word boundaries, as (start, end, canonical)."""
+        text = text.lower()
+        matches = []
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+
+            for length, canonical in self.output[state]:
+                start, end = i - length + 1, i + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if end < len(text) and text[end].isalnum():
+                    continue
+                matches.append((start, end, canonical))
+        return matches
+
+    def find(self, text):
+        """Leftmost-longest non-overlapping matches, as (start, end, canonical)."""
+        selected = []
+        last_end = 0
+        for start, end, canonical in sorted(self.find_all(text), key=lambda m: (m[0], -m[1])):
+            if start >= last_end:
+                selected.append((start, end, canonical))
+                last_end = end
+        return selected
+
+    def canonical_terms(self, text):
+        return {canonical for _, _, canonical in self.find(text)}
+
+    def coverage(self, text, matches=None):
+        """Fraction of the non-filler words in ``text`` that fall inside a lexicon match."""
+        text = text.lower()
+        matches = self.find(text) if matches is None else matches
+        words = [m for m in _WORD.finditer(text) if m.group() not in FILLER_WORDS]
+        if not words:
+            return 1.0
+        covered = sum(
+            any(start <= word.start() and word.end() <= end for start, end, _ in matches)
+            for word in words
+        )
+        return covered / len(words)
@@ -1,71 +1,90 @@
 import os
 import sys
-from typing import Optional, Tuple, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional, Tuple, List
 
-# Import all the custom modules
-from speech_rec import VoiceProcessor
-from medical import MedicalNLP
-from specialist import SpecialistRecommender
-from hospital import HospitalMatcher, HospitalVoiceInterface
+# Only the shared-resource accessors are imported here; speech, transformers
+# and scikit-learn are imported by the code paths that use them
+from cities import CITY_COORDINATES, find_city
+from resources import get_medical_nlp, get_specialist_recommender, get_hospital_matcher, get_emergency_table
+from specialist import SPECIALIST_SPECIALTIES
+from triage import emergency_keywords, triage
+
+if TYPE_CHECKING:
+    from medical import MedicalNLP
+
+# Fixed prompts, rendered into the TTS cache at startup so they play immediately
+MENU_PROMPT = (
+    "Welcome to Medical Voice Assistant! "
+    "Say 'symptoms' to describe your symptoms and get recommendations, "
+    "say 'hospitals' to find hospitals directly, "
+    "or say 'quit' to exit."
+)
+WELCOME_PROMPT = (
+    "Welcome to your Medical Voice Assistant! "
+    "I'm here to help you find the right specialist and hospital based on your symptoms. "
+    "Make sure you're in a quiet place for better speech recognition."
+)
+SYMPTOMS_PROMPT = "Please describe your symptoms clearly and in detail. "
+RETRY_PROMPT = (
+    "Let me try again. This is attempt {attempt} of {max_retries}. "
+    "Please speak slowly and clearly about your symptoms."
+)
+NO_SPEECH_PROMPT = "I didn't hear anything. Please try speaking again."
+NOT_UNDERSTOOD_PROMPT = "I couldn't understand what you said. Please speak more clearly."
+CONNECTION_PROMPT = "There was a connection issue. Let me try again."
+POOR_INPUT_PROMPT = (
+    "I didn't catch that clearly. Please make sure you're in a quiet place and speak directly into your microphone."
+)
+RECOGNITION_ERROR_PROMPT = "There was an issue with speech recognition. Let me try again."
+LOCATION_PROMPT = (
+    "To find nearby hospitals, please tell me your current city or location. "
+    "You can say 'skip' if you prefer not to share your location."
+)
+EMERGENCY_PROMPT = "Is this an emergency situation? Please say yes or no."
+EMERGENCY_ALERT_PROMPT = (
+    "Your symptoms may need immediate medical attention. "
+    "If this is life-threatening, call 112 now. I'll tell you the nearest emergency hospitals."
+)
+MORE_INFO_PROMPT = (
+    "Would you like more information about any specific hospital, "
+    "or do you have any other questions? Say 'yes' for more information or 'no' to end."
+)
+DEFAULT_MAX_RETRIES = 3
+
+STATIC_PROMPTS = (
+    MENU_PROMPT, WELCOME_PROMPT, SYMPTOMS_PROMPT, LOCATION_PROMPT, EMERGENCY_PROMPT, EMERGENCY_ALERT_PROMPT,
+    *(RETRY_PROMPT.format(attempt=n, max_retries=DEFAULT_MAX_RETRIES) for n in range(2, DEFAULT_MAX_RETRIES + 1)),
+    NO_SPEECH_PROMPT, NOT_UNDERSTOOD_PROMPT, CONNECTION_PROMPT, POOR_INPUT_PROMPT,
+    RECOGNITION_ERROR_PROMPT, MORE_INFO_PROMPT,
+)
 
 class MedicalVoiceAssistant:
-    def __init__(self):
+    def __init__(self, medical_nlp: Optional['MedicalNLP'] = None):
         print("Initializing Medical Voice Assistant...")
         
         try:
+            from speech_rec import VoiceProcessor
+            from hospital import HospitalVoiceInterface
+            
             # Initialize all components
             self.voice_processor = VoiceProcessor()
-            self.medical_nlp = MedicalNLP()
-            self.specialist_recommender = SpecialistRecommender()
-            self.hospital_matcher = HospitalMatcher()
-            self.hospital_voice_interface = HospitalVoiceInterface(
-                self.hospital_matcher, 
-                self.voice_processor
-            )
+            self.voice_processor.prewarm(STATIC_PROMPTS)
+            # Models and indexes are shared by every session in this process.
+            # They are loaded now but looked up on each use (see the properties
+            # below), so a hot reload reaches sessions that are already running.
+            self._medical_nlp = medical_nlp
+            if medical_nlp is None:
+                get_medical_nlp()
+            get_specialist_recommender()
+            # Nearest emergency hospitals per known city, for the triage fast path
+            get_emergency_table()
+            self.hospital_voice_interface = HospitalVoiceInterface(None, self.voice_processor)
+            # Runs symptom analysis and hospital ranking while the dialog continues
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='consultation')
             
             # City coordinates for location matching
-            self.city_coordinates = {
-                'delhi': (28.6139, 77.2090),
-                'new delhi': (28.6139, 77.2090),
-                'mumbai': (19.0760, 72.8777),
-                'bangalore': (12.9716, 77.5946),
-                'bengaluru': (12.9716, 77.5946),
-                'chennai': (13.0827, 80.2707),
-                'kolkata': (22.5726, 88.3639),
-                'hyderabad': (17.3850, 78.4867),
-                'pune': (18.5204, 73.8567),
-                'ahmedabad': (23.0225, 72.5714),
-                'jaipur': (26.9124, 75.7873),
-                'lucknow': (26.8467, 80.9462),
-                'chandigarh': (30.7333, 76.7794),
-                'gurgaon': (28.4595, 77.0266),
-                'gurugram': (28.4595, 77.0266),
-                'noida': (28.5355, 77.3910),
-                'ghaziabad': (28.6692, 77.4538),
-                'faridabad': (28.4089, 77.3178),
-                'indore': (22.7196, 75.8577),
-                'bhopal': (23.2599, 77.4126),
-                'patna': (25.5941, 85.1376),
-                'nagpur': (21.1458, 79.0882),
-                'surat': (21.1702, 72.8311),
-                'vadodara': (22.3072, 73.1812),
-                'rajkot': (22.3039, 70.8022),
-                'coimbatore': (11.0168, 76.9558),
-                'madurai': (9.9252, 78.1198),
-                'kochi': (9.9312, 76.2673),
-                'thiruvananthapuram': (8.5241, 76.9366),
-                'visakhapatnam': (17.6868, 83.2185),
-                'vijayawada': (16.5062, 80.6480),
-                'bhubaneswar': (20.2961, 85.8245),
-                'raipur': (21.2514, 81.6296),
-                'ranchi': (23.3441, 85.3096),
-                'dehradun': (30.3165, 78.0322),
-                'shimla': (31.1048, 77.1734),
-                'jammu': (32.7266, 74.8570),
-                'srinagar': (34.0837, 74.7973),
-                'guwahati': (26.1445, 91.7362),
-                'agartala': (23.8315, 91.2868)
-            }
+            self.city_coordinates = CITY_COORDINATES
             
             print("Medical Voice Assistant initialized successfully!")
             
@@ -73,23 +92,35 @@ class MedicalVoiceAssistant:
             print(f"Error initializing components: {str(e)}")
             sys.exit(1)
     
+    @property
+    def medical_nlp(self) -> 'MedicalNLP':
+        return self._medical_nlp or get_medical_nlp()
+    
+    @property
+    def specialist_recommender(self):
+        return get_specialist_recommender()
+    
+    @property
+    def hospital_matcher(self):
+        return get_hospital_matcher()
+    
+    @property
+    def emergency_table(self):
+        return get_emergency_table()
+    
     def extract_location_from_speech(self, text: str) -> Optional[Tuple[float, float]]:
         """Extract user location from speech text"""
-        text_lower = text.lower()
-        
-        for city, coords in self.city_coordinates.items():
-            if city in text_lower:
-                print(f"📍 Detected location: {city.title()}")
-                return coords
+        found = find_city(text)
+        if found is None:
+            return None
         
-        return None
+        city, coords = found
+        print(f"📍 Detected location: {city.title()}")
+        return coords
     
     def get_user_location(self) -> Optional[Tuple[float, float]]:
         """Get user location through voice input"""
-        self.voice_processor.speak_response(
-            "To find nearby hospitals, please tell me your current city or location. "
-            "You can say 'skip' if you prefer not to share your location."
-        )
+        self.voice_processor.speak_response(LOCATION_PROMPT)
         
         location_input = self.voice_processor.listen_to_speech()
         print(f"Location input: {location_input}")
@@ -99,71 +130,52 @@ class MedicalVoiceAssistant:
         
         return self.extract_location_from_speech(location_input)
     
-    def get_symptoms_with_retry(self, max_retries: int = 3) -> str:
+    def get_symptoms_with_retry(self, max_retries: int = DEFAULT_MAX_RETRIES) -> str:
         """Get symptoms from user with retry mechanism for better accuracy"""
         
-        # Initialize speech recognition with better settings (similar to test code)
+        # The voice processor's microphone session is opened and calibrated
+        # once and keeps listening between turns
         import speech_recognition as sr
-        recognizer = sr.Recognizer()
-        microphone = sr.Microphone()
-        
-        # Adjust for ambient noise first (like in test code)
-        print(" Adjusting for ambient noise... Please wait.")
-        try:
-            with microphone as source:
-                recognizer.adjust_for_ambient_noise(source, duration=2)
-                print(f"Ambient noise level set to: {recognizer.energy_threshold}")
-        except Exception as e:
-            print(f"⚠️ Could not adjust for ambient noise: {e}")
         
         for attempt in range(max_retries):
             try:
                 if attempt == 0:
-                    prompt = (
-                        "Please describe your symptoms clearly and in detail. "
-                    )
+                    prompt = SYMPTOMS_PROMPT
                 else:
-                    prompt = (
-                        f"Let me try again. This is attempt {attempt + 1} of {max_retries}. "
-                        "Please speak slowly and clearly about your symptoms."
-                    )
+                    prompt = RETRY_PROMPT.format(attempt=attempt + 1, max_retries=max_retries)
                 
                 print(f"\n Listening for symptoms (Attempt {attempt + 1}/{max_retries})...")
                 self.voice_processor.speak_response(prompt)
-                
-                import time
-                time.sleep(2) 
 
                 print("Listening... (up to 10 seconds)")
                 try:
-                    with microphone as source:
-                        # Listen with longer timeout and phrase limit
-                        audio = recognizer.listen(source, timeout=10, phrase_time_limit=8)
+                    # Waits for the prompt to finish, then for the end of the user's phrase.
+                    # With a streaming recognizer, symptom extraction starts on the
+                    # partial transcript while the user is still talking.
+                    self.voice_processor.on_partial = self.medical_nlp.prefetch_symptoms
+                    try:
+                        audio = self.voice_processor.capture_phrase(timeout=10)
+                    finally:
+                        self.voice_processor.on_partial = None
                     
                     print("Processing speech...")
-                    symptom_text = recognizer.recognize_google(audio)
+                    symptom_text = self.voice_processor.recognize(audio)
                     print(f"User input: '{symptom_text}'")
                     
                 except sr.WaitTimeoutError:
                     print("Timeout - no speech detected")
                     if attempt < max_retries - 1:
-                        self.voice_processor.speak_response(
-                            "I didn't hear anything. Please try speaking again."
-                        )
+                        self.voice_processor.speak_response(NO_SPEECH_PROMPT)
                     continue
                 except sr.UnknownValueError:
                     print(" Could not understand the audio")
                     if attempt < max_retries - 1:
-                        self.voice_processor.speak_response(
-                            "I couldn't understand what you said. Please speak more clearly."
-                        )
+                        self.voice_processor.speak_response(NOT_UNDERSTOOD_PROMPT)
                     continue
                 except sr.RequestError as e:
                     print(f"Speech recognition service error: {e}")
                     if attempt < max_retries - 1:
-                        self.voice_processor.speak_response(
-                            "There was a connection issue. Let me try again."
-                        )
+                        self.voice_processor.speak_response(CONNECTION_PROMPT)
                     continue
                 
                 # Check if we got meaningful input
@@ -179,9 +191,8 @@ class MedicalVoiceAssistant:
                     
                     try:
                         print("Waiting for confirmation...")
-                        with microphone as source:
-                            audio = recognizer.listen(source, timeout=8, phrase_time_limit=3)
-                        confirmation_response = recognizer.recognize_google(audio)
+                        audio = self.voice_processor.capture_phrase(timeout=8)
+                        confirmation_response = self.voice_processor.recognize(audio)
                         print(f" Confirmation: {confirmation_response}")
                         
                         if "yes" in confirmation_response.lower() or "correct" in confirmation_response.lower():
@@ -195,17 +206,13 @@ class MedicalVoiceAssistant:
                 else:
                     print("Poor quality input detected, retrying...")
                     if attempt < max_retries - 1:
-                        self.voice_processor.speak_response(
-                            "I didn't catch that clearly. Please make sure you're in a quiet place and speak directly into your microphone."
-                        )
+                        self.voice_processor.speak_response(POOR_INPUT_PROMPT)
                     continue
                     
             except Exception as e:
                 print(f" Error during speech recognition attempt {attempt + 1}: {str(e)}")
                 if attempt < max_retries - 1:
-                    self.voice_processor.speak_response(
-                        "There was an issue with speech recognition. Let me try again."
-                    )
+                    self.voice_processor.speak_response(RECOGNITION_ERROR_PROMPT)
                 continue
         
         # If all attempts failed, ask for manual input or provide fallback
@@ -220,9 +227,7 @@ class MedicalVoiceAssistant:
     
     def check_emergency(self) -> bool:
         """Check if this is an emergency situation"""
-        self.voice_processor.speak_response(
-            "Is this an emergency situation? Please say yes or no."
-        )
+        self.voice_processor.speak_response(EMERGENCY_PROMPT)
         
         emergency_input = self.voice_processor.listen_to_speech()
         print(f" Emergency input: {emergency_input}")
@@ -259,8 +264,7 @@ class MedicalVoiceAssistant:
             hospital_response = "I couldn't find specific hospitals matching your criteria. I recommend searching for general hospitals in your area. "
         
         # Emergency advice
-        emergency_keywords = ['chest pain', 'shortness of breath', 'severe pain', 'bleeding', 'unconscious']
-        if any(keyword in ' '.join(symptoms).lower() for keyword in emergency_keywords):
+        if emergency_keywords(' '.join(symptoms)):
             emergency_response = "⚠️ IMPORTANT: Your symptoms may require immediate medical attention. Please consider visiting the nearest emergency room or calling emergency services. "
         else:
             emergency_response = ""
@@ -277,15 +281,62 @@ class MedicalVoiceAssistant:
         
         return complete_response
     
+    def analyze_symptoms(self, symptom_text: str):
+        """Extract symptoms and recommend a specialist; returns (symptoms, specialist, confidence)"""
+        print("Analyzing symptoms...")
+        symptoms = self.medical_nlp.extract_symptoms(symptom_text)
+        print(f"📋 Extracted symptoms: {symptoms}")
+        
+        if not symptoms:
+            # Fallback: use the raw text if no specific symptoms extracted
+            symptoms = [symptom_text]
+        
+        print("Finding specialist recommendation...")
+        specialist, confidence = self.specialist_recommender.recommend_specialist(symptoms)
+        print(f"Recommended specialist: {specialist} (confidence: {confidence:.2f})")
+        
+        # Score every hospital for the specialty now; only the location filter is left
+        self.hospital_matcher.prefetch_specialty(SPECIALIST_SPECIALTIES.get(specialist, 'general medicine'))
+        return symptoms, specialist, confidence
+    
+    def rank_hospitals(self, analysis, user_location: Optional[Tuple[float, float]]):
+        """Hospitals for both answers to the emergency question, keyed by is_emergency"""
+        _, specialist, _ = analysis.result()
+        specialty = SPECIALIST_SPECIALTIES.get(specialist, 'general medicine')
+        hospital_matcher = self.hospital_matcher
+        return {
+            True: (self.emergency_table.nearest(user_location) if user_location
+                   else hospital_matcher.find_emergency_hospitals(None, max_distance=100)),
+            False: hospital_matcher.get_comprehensive_recommendation(
+                specialty, user_location, None, False  # Removed insurance parameter
+            ),
+        }
+    
+    def handle_emergency(self, triage_result):
+        """Fast path for red-flag symptoms: nearest emergency hospitals, no models, no further questions"""
+        print(f"🚨 Emergency keywords: {', '.join(triage_result['keywords'])} "
+              f"(triage {triage_result['elapsed_ms']:.1f} ms)")
+        self.voice_processor.speak_response(EMERGENCY_ALERT_PROMPT)
+        
+        hospitals = triage_result['hospitals']
+        if hospitals is None:
+            user_location = self.get_user_location()
+            hospitals = (self.emergency_table.nearest(user_location) if user_location
+                         else self.hospital_matcher.find_emergency_hospitals(None, limit=5))
+        
+        guidance = self.hospital_voice_interface.provide_hospital_guidance(hospitals)
+        print(f"\n📢 Response: {guidance}")
+        self.voice_processor.speak_streaming(guidance)
+        return hospitals
+    
     def run_medical_consultation(self):
         """Main consultation flow"""
         try:
             # Welcome message
-            welcome_message = (
-                "Welcome to your Medical Voice Assistant! "
-                "I'm here to help you find the right specialist and hospital based on your symptoms. "
-                "Make sure you're in a quiet place for better speech recognition."
-            )
+            welcome_message = WELCOME_PROMPT
+            
+            # Load the NLP models in the background while the welcome is spoken
+            self.medical_nlp.warm_up()
             
             print(welcome_message)
             self.voice_processor.speak_response(welcome_message)
@@ -300,49 +351,27 @@ class MedicalVoiceAssistant:
                 )
                 return
             
-            # Extract symptoms using NLP
-            print("Analyzing symptoms...")
-            symptoms = self.medical_nlp.extract_symptoms(symptom_text)
-            print(f"📋 Extracted symptoms: {symptoms}")
-            
-            if not symptoms:
-                # Fallback: use the raw text if no specific symptoms extracted
-                symptoms = [symptom_text]
+            # Red-flag symptoms skip the models and the remaining questions
+            triage_result = triage(symptom_text, self.emergency_table)
+            if triage_result['emergency']:
+                self.handle_emergency(triage_result)
+                return
             
-            # Get specialist recommendation
-            print("Finding specialist recommendation...")
-            specialist, confidence = self.specialist_recommender.recommend_specialist(symptoms)
-            print(f"Recommended specialist: {specialist} (confidence: {confidence:.2f})")
+            # Analyze symptoms while the location question is asked and answered
+            analysis = self._executor.submit(self.analyze_symptoms, symptom_text)
             
             # Get user location
             user_location = self.get_user_location()
             
+            # Rank hospitals for both possible answers while the emergency question is asked
+            print("Finding suitable hospitals...")
+            rankings = self._executor.submit(self.rank_hospitals, analysis, user_location)
+            
             # Check if emergency
             is_emergency = self.check_emergency()
             
-            # Find suitable hospitals
-            print("Finding suitable hospitals...")
-            if is_emergency:
-                hospitals = self.hospital_matcher.find_emergency_hospitals(
-                    user_location, max_distance=100
-                )
-            else:
-                # Map specialist to medical specialty
-                specialty_mapping = {
-                    'Cardiologist': 'cardiology',
-                    'Dermatologist': 'dermatology', 
-                    'Gastroenterologist': 'gastroenterology',
-                    'Neurologist': 'neurology',
-                    'Pulmonologist': 'pulmonology',
-                    'Orthopedist': 'orthopedics',
-                    'Psychiatrist': 'psychiatry',
-                    'General Practitioner': 'general medicine'
-                }
-                
-                specialty = specialty_mapping.get(specialist, 'general medicine')
-                hospitals = self.hospital_matcher.get_comprehensive_recommendation(
-                    specialty, user_location, None, is_emergency  # Removed insurance parameter
-                )
+            symptoms, specialist, confidence = analysis.result()
+            hospitals = rankings.result()[is_emergency]
             
             print(f"Found {len(hospitals)} hospitals")
             
@@ -352,13 +381,10 @@ class MedicalVoiceAssistant:
             )
             
             print(f"\n📢 Response: {guidance}")
-            self.voice_processor.speak_response(guidance)
+            self.voice_processor.speak_streaming(guidance)
             
             # Ask if user wants more information
-            self.voice_processor.speak_response(
-                "Would you like more information about any specific hospital, "
-                "or do you have any other questions? Say 'yes' for more information or 'no' to end."
-            )
+            self.voice_processor.speak_response(MORE_INFO_PROMPT)
             
             more_info = self.voice_processor.listen_to_speech()
             
@@ -387,12 +413,7 @@ class MedicalVoiceAssistant:
         """Run in interactive mode with menu options"""
         while True:
             try:
-                menu_message = (
-                    "Welcome to Medical Voice Assistant! "
-                    "Say 'symptoms' to describe your symptoms and get recommendations, "
-                    "say 'hospitals' to find hospitals directly, "
-                    "or say 'quit' to exit."
-                )
+                menu_message = MENU_PROMPT
                 
                 print("\n" + "="*50)
                 print("MEDICAL VOICE ASSISTANT - MAIN MENU")
@@ -421,6 +442,7 @@ class MedicalVoiceAssistant:
             
             except KeyboardInterrupt:
                 print("\n👋 Exiting Medical Voice Assistant")
+                self.voice_processor.cancel_speech()
                 break
             except Exception as e:
                 print(f" Error in interactive mode: {str(e)}")
@@ -435,6 +457,8 @@ def main():
         
         # Run in interactive mode
         assistant.run_interactive_mode()
+        # Speech plays on a background thread; let the goodbye finish
+        assistant.voice_processor.wait_for_speech(timeout=15)
         
     except Exception as e:
         print(f"Failed to start Medical Voice Assistant: {str(e)}")
@@ -1,15 +1,29 @@
 import streamlit as st
 import threading
 import time
-from speech_rec import VoiceProcessor
-from specialist import SpecialistRecommender
-from medical import MedicalNLP
+from resources import shared, get_medical_nlp, get_specialist_recommender
 
 class MedicalChatbot:
     def __init__(self):
-        self.voice_processor = VoiceProcessor()
-        self.nlp_processor = MedicalNLP()
-        self.recommender = SpecialistRecommender()
+        # Shared across reruns and sessions; built once per process
+        get_medical_nlp()
+        get_specialist_recommender()
+    
+    @property
+    def nlp_processor(self):
+        # Looked up on each use, so a hot reload replaces it everywhere
+        return get_medical_nlp()
+    
+    @property
+    def recommender(self):
+        return get_specialist_recommender()
+    
+    @property
+    def voice_processor(self):
+        # Text-only use never imports the speech stack or opens the microphone
+        from speech_rec import VoiceProcessor
+        
+        return shared('voice_processor', VoiceProcessor)
     
     def process_patient_input(self, text_input=None):
         if text_input:
@@ -82,6 +96,31 @@ def main():
                     'response': response
                 })
     
+    batching_stats = chatbot.nlp_processor.batching_stats()
+    if batching_stats:
+        with st.sidebar.expander("NER batching"):
+            st.write(f"Requests: {batching_stats['requests']} in {batching_stats['batches']} batches "
+                     f"(mean size {batching_stats['mean_batch_size']:.1f})")
+            st.write(f"Latency p50 / p99: {batching_stats['p50_ms']:.0f} / {batching_stats['p99_ms']:.0f} ms")
+    
+    cascade_stats = chatbot.nlp_processor.cascade_stats()
+    with st.sidebar.expander("Symptom cascade"):
+        st.write(f"Lexicon only: {cascade_stats['lexical']}, NER: {cascade_stats['ner']} "
+                 f"({cascade_stats['ner_avoided_rate']:.0%} of extractions skipped the model)")
+    
+    with st.sidebar.expander("Models"):
+        for name, info in chatbot.nlp_processor.model_report().items():
+            if info.get('loaded'):
+                st.write(f"{name}: loaded in {info['load_s']:.1f}s, +{info['rss_mb']:.0f} MB")
+            else:
+                st.write(f"{name}: {'enabled, not loaded yet' if info['enabled'] else 'disabled'}")
+    
+    with st.sidebar.expander("Result cache"):
+        for name, cache in [('Symptoms', chatbot.nlp_processor.cache), ('Specialist', chatbot.recommender.cache)]:
+            cache_stats = cache.stats()
+            st.write(f"{name}: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                     f"{cache_stats['evictions']} evictions ({cache_stats['size']}/{cache_stats['maxsize']})")
+    
     for chat in st.session_state.conversation_history:
         st.write("**You:**", chat['user'])
         st.write("**Detected Symptoms:**", ', '.join(chat['symptoms']))
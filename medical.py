@@ -1,33 +1,289 @@
-from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification
+import hashlib
+import json
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from batching import MicroBatcher
+from cache import normalize_text
+from lexicon import SymptomLexicon
+from models import ModelRegistry
+from ner_backend import load_ner_pipeline
+
+# The BioBERT tokenizer and PubMedBERT classifier are not used by the symptom
+# path; they stay registered but are only loaded when explicitly enabled.
+DEFAULT_MODELS = ('ner',)
+
+def merge_entities(entities):
+    """Deduplicate entities found by overlapping windows
+
+    Of overlapping spans with the same group the longest one is kept (the
+    others are usually the same entity cut at a window edge), ties going
+    to the higher score.
+    """
+    kept = []
+    last_by_group = {}
+    for entity in sorted(entities, key=lambda e: (e['start'], e['start'] - e['end'])):
+        previous = last_by_group.get(entity['entity_group'])
+        if previous is not None and entity['start'] < previous['end']:
+            longer = entity['end'] - entity['start'] > previous['end'] - previous['start']
+            better = entity['end'] - entity['start'] == previous['end'] - previous['start'] \
+                and entity['score'] > previous['score']
+            if longer or better:
+                kept[kept.index(previous)] = entity
+                last_by_group[entity['entity_group']] = entity
+            continue
+        kept.append(entity)
+        last_by_group[entity['entity_group']] = entity
+    return kept
 
 class MedicalNLP:
-    def __init__(self):
-        self.tokenizer = AutoTokenizer.from_pretrained("dmis-lab/biobert-base-cased-v1.1") #biobert 
-        self.ner_pipeline = pipeline("ner", 
-                                   model="d4data/biomedical-ner-all",
-                                   tokenizer="d4data/biomedical-ner-all",
-                                   aggregation_strategy="simple")
+    def __init__(self, batching=False, max_batch_size=16, max_wait_ms=10, lexicon_path=None, cache=None,
+                 ner_backend='torch', quantize=False, enabled_models=DEFAULT_MODELS, warm_up=False,
+                 cascade=True, min_lexical_terms=1, min_lexical_coverage=0.6,
+                 chunk_tokens=256, chunk_stride=32, ner_batch_size=16):
+        # Optional cache.ResultCache keyed by settings version and normalized utterance
+        self.cache = cache
+        # The lexicon answers alone when it finds at least ``min_lexical_terms``
+        # symptoms covering ``min_lexical_coverage`` of the non-filler words;
+        # everything else goes to the NER model
+        self.cascade = cascade
+        self.min_lexical_terms = min_lexical_terms
+        self.min_lexical_coverage = min_lexical_coverage
+        self.stage_counts = {'lexical': 0, 'ner': 0}
+        self._stage_lock = threading.Lock()
+        # Texts longer than ``chunk_tokens`` are split into windows overlapping
+        # by ``chunk_stride`` tokens (the model itself truncates at 512) and
+        # run through NER ``ner_batch_size`` windows per forward pass
+        self.chunk_tokens = chunk_tokens
+        self.chunk_stride = chunk_stride
+        self.ner_batch_size = ner_batch_size
+        self.lexicon = SymptomLexicon.load(lexicon_path) if lexicon_path else SymptomLexicon.load()
+        # 'onnx' runs the same model through onnxruntime, optionally int8-quantized
+        self.ner_backend = ner_backend
+        
+        # Models load on first use (or in warm_up) rather than here
+        self.models = ModelRegistry(enabled_models)
+        self.models.register('ner', lambda: load_ner_pipeline(ner_backend, quantize))
+        self.models.register('biobert_tokenizer', self._load_biobert_tokenizer)
+        self.models.register('pubmedbert_classifier', self._load_pubmedbert_classifier)
+        if warm_up:
+            self.warm_up()
+
+        # Cached results are only reused by an instance with the same lexicon,
+        # model backend and cascade/chunking settings
+        self.cache_version = hashlib.sha256(json.dumps([
+            self.lexicon.source_hash, ner_backend, quantize, cascade, min_lexical_terms,
+            min_lexical_coverage, chunk_tokens, chunk_stride,
+        ]).encode('utf-8')).hexdigest()[:16]
+
+        # Concurrent callers (Streamlit sessions, voice sessions) share one
+        # padded forward pass per batch instead of one pass per utterance
+        self.batcher = None
+        if batching:
+            self.batcher = MicroBatcher(
+                self.extract_symptoms_batch, max_batch_size, max_wait_ms, name='ner-batcher'
+            )
+        self._prefetcher = None
+        self._prefetch = None
+        # (normalized text, stage, symptoms) of the last prefetched partial
+        self._prefetched = None
+
+    @staticmethod
+    def _load_biobert_tokenizer():
+        from transformers import AutoTokenizer
+        
+        return AutoTokenizer.from_pretrained("dmis-lab/biobert-base-cased-v1.1") #biobert 
+    
+    @staticmethod
+    def _load_pubmedbert_classifier():
+        from transformers import pipeline
         
-        self.classifier = pipeline("text-classification", 
-                                 model="microsoft/BiomedNLP-PubMedBERT-base-uncased-abstract")
+        return pipeline("text-classification", 
+                        model="microsoft/BiomedNLP-PubMedBERT-base-uncased-abstract")
     
+    @property
+    def ner_pipeline(self):
+        return self.models.get('ner')
+    
+    @property
+    def tokenizer(self):
+        return self.models.get('biobert_tokenizer')
+    
+    @property
+    def classifier(self):
+        return self.models.get('pubmedbert_classifier')
+    
+    def warm_up(self, background=True):
+        """Load the enabled models ahead of the first request"""
+        return self.models.warm_up(background=background)
+    
+    def model_report(self):
+        return self.models.report()
+
     def extract_symptoms(self, text):
-        entities = self.ner_pipeline(text)
-        symptoms = []
+        normalized = normalize_text(text)
+        key = f"{self.cache_version}:{normalized}" if self.cache is not None else None
+        if key is not None:
+            symptoms = self.cache.get(key)
+            if symptoms is not None:
+                return symptoms
+        
+        prefetched = self._prefetched
+        if prefetched is not None and prefetched[0] == normalized:
+            _, stage, symptoms = prefetched
+        else:
+            stage, symptoms = self._extract(text)
+        self._count(stage)
         
+        if key is not None:
+            self.cache.set(key, symptoms)
+        return symptoms
+
+    def _extract(self, text):
+        """(stage, symptoms) for ``text``, without touching the cache or the counters"""
+        symptoms = self.lexical_symptoms(text) if self.cascade else None
+        if symptoms is not None:
+            return 'lexical', symptoms
+        if self.batcher is not None:
+            return 'ner', self.batcher(text)
+        return 'ner', self.symptoms_from_entities(text, self.ner_entities([text])[0])
+
+    def extract_symptoms_async(self, text):
+        """Future for the symptoms in ``text``, batched with other pending requests"""
+        if self.batcher is None:
+            raise RuntimeError("MedicalNLP was created without batching=True")
+        return self.batcher.submit(text)
+
+    def prefetch_symptoms(self, text):
+        """Extract symptoms from a partial transcript in the background
+
+        The model is warm either way, and when the final transcript matches
+        the last partial its result is reused. Partials are not cached or
+        counted. While an earlier prefetch is still running the new text is
+        skipped.
+        """
+        if self._prefetch is not None and not self._prefetch.done():
+            return self._prefetch
+        if self._prefetcher is None:
+            self._prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='symptom-prefetch')
+        self._prefetch = self._prefetcher.submit(self._prefetch_one, text)
+        return self._prefetch
+
+    def _prefetch_one(self, text):
+        stage, symptoms = self._extract(text)
+        self._prefetched = (normalize_text(text), stage, symptoms)
+        return symptoms
+
+    def extract_symptoms_batch(self, texts):
+        """Run one padded NER batch over ``texts`` and return symptoms per text"""
+        if not texts:
+            return []
+        entities = self.ner_entities(texts)
+        return [self.symptoms_from_entities(text, ents) for text, ents in zip(texts, entities)]
+
+    def chunk_spans(self, text):
+        """Character spans of overlapping token windows covering ``text``"""
+        # A token covers at least one character, so short texts fit in one window
+        if len(text) <= self.chunk_tokens:
+            return [(0, len(text))]
+        encoding = self.ner_pipeline.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        offsets, word_ids = encoding['offset_mapping'], encoding.word_ids()
+        n_tokens = len(offsets)
+        if n_tokens <= self.chunk_tokens:
+            return [(0, len(text))]
+
+        spans = []
+        first = 0
+        while True:
+            limit = min(first + self.chunk_tokens, n_tokens) - 1
+            # Don't end a window in the middle of a word, unless that would
+            # cut it to less than half (a word longer than the window)
+            last = limit
+            while last + 1 < n_tokens and last > first and word_ids[last + 1] == word_ids[last]:
+                last -= 1
+            if last - first < self.chunk_tokens // 2:
+                last = limit
+            spans.append((offsets[first][0], offsets[last][1]))
+            if last == n_tokens - 1:
+                return spans
+            next_first = max(last + 1 - self.chunk_stride, first + 1)
+            # ... or start one there, backing off at most another stride
+            earliest = max(next_first - self.chunk_stride, first + 1)
+            while next_first > earliest and word_ids[next_first - 1] == word_ids[next_first]:
+                next_first -= 1
+            first = next_first
+
+    def ner_entities(self, texts):
+        """NER entities per text, with long texts split into overlapping windows
+
+        All windows of all texts go through the model together, and entity
+        offsets are mapped back to the full text and deduplicated.
+        """
+        chunks = []
+        owners = []
+        n_chunks = []
+        for i, text in enumerate(texts):
+            spans = self.chunk_spans(text)
+            for start, end in spans:
+                chunks.append((start, text[start:end]))
+                owners.append(i)
+            n_chunks.append(len(spans))
+
+        outputs = self.ner_pipeline([chunk for _, chunk in chunks],
+                                    batch_size=min(len(chunks), self.ner_batch_size))
+        entities = [[] for _ in texts]
+        for (offset, _), owner, found in zip(chunks, owners, outputs):
+            for entity in found:
+                entities[owner].append(dict(entity, start=entity['start'] + offset,
+                                            end=entity['end'] + offset))
+        return [merge_entities(found) if n > 1 else found for found, n in zip(entities, n_chunks)]
+
+    def lexical_symptoms(self, text):
+        """Symptoms from the lexicon alone, or None if its coverage of ``text`` is too low"""
+        matches = self.lexicon.find(text)
+        terms = {canonical for _, _, canonical in matches}
+        if len(terms) < self.min_lexical_terms:
+            return None
+        if self.lexicon.coverage(text, matches) < self.min_lexical_coverage:
+            return None
+        return list(terms)
+
+    def _count(self, stage):
+        with self._stage_lock:
+            self.stage_counts[stage] += 1
+
+    def cascade_stats(self):
+        lexical, ner = self.stage_counts['lexical'], self.stage_counts['ner']
+        total = lexical + ner
+        return {
+            'lexical': lexical,
+            'ner': ner,
+            'ner_avoided_rate': lexical / total if total else 0.0,
+            'min_lexical_terms': self.min_lexical_terms,
+            'min_lexical_coverage': self.min_lexical_coverage,
+        }
+
+    def close(self):
+        """Stop the batching and prefetch threads and close the result cache"""
+        if self.batcher is not None:
+            self.batcher.close()
+        if self._prefetcher is not None:
+            self._prefetcher.shutdown()
+        if self.cache is not None:
+            self.cache.close()
+
+    def batching_stats(self):
+        return self.batcher.stats() if self.batcher is not None else None
+
+    def symptoms_from_entities(self, text, entities):
+        symptoms = []
+
         for entity in entities:
             if entity['entity_group'] in ['DISEASE', 'SYMPTOM', 'BODY_PART']:
                 symptoms.append(entity['word'])
+
+        # Single pass over the text for every lexicon term, on word boundaries
+        symptoms.extend(self.lexicon.canonical_terms(text))
         
-        symptom_keywords = [
-            'headache', 'fever', 'cough', 'nausea', 'vomiting', 'diarrhea',
-            'chest pain', 'shortness of breath', 'fatigue', 'dizziness',
-            'abdominal pain', 'back pain', 'joint pain', 'rash', 'swelling', 'hurts'
-        ]
-        
-        for keyword in symptom_keywords:
-            if keyword in text:
-                symptoms.append(keyword)
-        
-        return list(set(symptoms))
\ No newline at end of file
+        return list(set(symptoms))
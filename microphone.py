@@ -0,0 +1,203 @@
+"""Long-lived, calibrated microphone capture.
+
+``MicrophoneSession`` opens the microphone once on a background thread,
+calibrates for ambient noise once and then captures phrases continuously.
+Phrases are endpointed by the recognizer's energy-based voice activity
+detection and handed to callers through a queue, so a dialog turn only
+costs the time the user actually speaks. Phrases that overlap our own
+speech output, or that were captured before the caller started listening,
+are dropped.
+
+With a streaming ASR backend the session reads the audio itself, does the
+endpointing with an RMS energy detector and feeds each buffer to the
+recognizer as it arrives, reporting partial hypotheses to ``on_partial``
+while the user is still speaking.
+"""
+import math
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import speech_recognition as sr
+
+
+def rms(frames):
+    """Root-mean-square energy of 16-bit PCM, on the same scale as the recognizer's threshold."""
+    samples = np.frombuffer(frames, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+
+class MicrophoneSession:
+    def __init__(self, recognizer, microphone, calibrate_s=1.0, recalibrate_every_s=60.0,
+                 pause_threshold=0.6, phrase_time_limit=10, spoke_since=None, asr=None,
+                 on_partial=None):
+        self.recognizer = recognizer
+        self.microphone = microphone
+        self.calibrate_s = calibrate_s
+        self.recalibrate_every_s = recalibrate_every_s
+        self.phrase_time_limit = phrase_time_limit
+        # Called with a phrase's start time; True if we were talking meanwhile
+        self.spoke_since = spoke_since or (lambda started_at: False)
+        self.asr = asr
+        # Called with the hypothesis so far while a phrase is being spoken
+        self.on_partial = on_partial
+
+        # End a phrase after this much silence (speech_recognition's default is 0.8 s)
+        recognizer.pause_threshold = pause_threshold
+        recognizer.non_speaking_duration = min(recognizer.non_speaking_duration, pause_threshold)
+        recognizer.dynamic_energy_threshold = True
+
+        self._phrases = queue.Queue()  # (started_at, ended_at, AudioData)
+        self._listeners = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.error = None
+        self.calibrations = 0
+        self.dropped_echo = 0
+        self.dropped_stale = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='mic-session', daemon=True)
+                self._thread.start()
+        self._ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.phrase_time_limit + 2)
+
+    def _calibrate(self, source, duration):
+        self.recognizer.adjust_for_ambient_noise(source, duration=duration)
+        self.calibrations += 1
+        self._calibrated_at = time.monotonic()
+
+    def _run(self):
+        try:
+            with self.microphone as source:
+                self._calibrate(source, self.calibrate_s)
+                print(f"Ambient noise level set to: {self.recognizer.energy_threshold:.0f}")
+                self._ready.set()
+                self._capture(source)
+        except Exception as e:
+            self.error = e
+            print(f"Microphone session stopped: {e}")
+        finally:
+            self._ready.set()
+
+    def _capture(self, source):
+        seconds_per_buffer = source.CHUNK / source.SAMPLE_RATE
+        streaming = self.asr is not None and self.asr.streaming
+        while not self._stopped.is_set():
+            # Recalibrate only while nobody is waiting for an answer
+            if (not self._listeners
+                    and time.monotonic() - self._calibrated_at > self.recalibrate_every_s):
+                self._calibrate(source, 0.5)
+
+            try:
+                # A short timeout keeps the loop responsive to stop() and recalibration
+                if streaming:
+                    audio = self._listen_streaming(source, timeout=1)
+                else:
+                    audio = self.recognizer.listen(
+                        source, timeout=1, phrase_time_limit=self.phrase_time_limit
+                    )
+            except sr.WaitTimeoutError:
+                continue
+
+            ended_at = time.monotonic()
+            duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+            started_at = ended_at - duration - seconds_per_buffer
+            if self.spoke_since(started_at):
+                # Our own prompt coming back through the speakers
+                self.dropped_echo += 1
+                continue
+            self._phrases.put((started_at, ended_at, audio))
+
+    def _listen_streaming(self, source, timeout):
+        """Like ``Recognizer.listen``, but feeds the ASR stream while recording."""
+        recognizer = self.recognizer
+        seconds_per_buffer = source.CHUNK / source.SAMPLE_RATE
+        pause_buffers = math.ceil(recognizer.pause_threshold / seconds_per_buffer)
+        preroll_buffers = math.ceil(recognizer.non_speaking_duration / seconds_per_buffer)
+        max_buffers = math.ceil(self.phrase_time_limit / seconds_per_buffer)
+
+        # Wait for speech, adapting the threshold to the background noise
+        frames = deque(maxlen=preroll_buffers + 1)
+        waited = 0.0
+        while True:
+            buffer = source.stream.read(source.CHUNK)
+            frames.append(buffer)
+            energy = rms(buffer)
+            if energy > recognizer.energy_threshold:
+                break
+            waited += seconds_per_buffer
+            if waited > timeout:
+                raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+            if recognizer.dynamic_energy_threshold:
+                damping = recognizer.dynamic_energy_adjustment_damping ** seconds_per_buffer
+                target = energy * recognizer.dynamic_energy_ratio
+                recognizer.energy_threshold = recognizer.energy_threshold * damping + target * (1 - damping)
+
+        frames = list(frames)
+        stream = self.asr.stream(source.SAMPLE_RATE)
+        hypothesis = stream.accept(b''.join(frames))
+        silent = 0
+        while silent < pause_buffers and len(frames) < max_buffers:
+            buffer = source.stream.read(source.CHUNK)
+            frames.append(buffer)
+            silent = 0 if rms(buffer) > recognizer.energy_threshold else silent + 1
+            partial = stream.accept(buffer)
+            if partial and partial != hypothesis:
+                hypothesis = partial
+                if self.on_partial is not None:
+                    try:
+                        self.on_partial(partial)
+                    except Exception as e:
+                        print(f"Partial transcript handler failed: {e}")
+        return sr.AudioData(b''.join(frames), source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+
+    def capture_phrase(self, timeout=10, since=None):
+        """Next phrase that started after ``since`` (default: now).
+
+        Raises ``sr.WaitTimeoutError`` if none arrives within ``timeout`` seconds.
+        """
+        self.start()
+        since = time.monotonic() if since is None else since
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._listeners += 1
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+                try:
+                    started_at, _, audio = self._phrases.get(timeout=min(remaining, 0.5))
+                except queue.Empty:
+                    if self.error is not None:
+                        raise self.error
+                    continue
+                if started_at < since:
+                    self.dropped_stale += 1
+                    continue
+                return audio
+        finally:
+            with self._lock:
+                self._listeners -= 1
+
+    def stats(self):
+        return {
+            'energy_threshold': self.recognizer.energy_threshold,
+            'calibrations': self.calibrations,
+            'queued': self._phrases.qsize(),
+            'dropped_echo': self.dropped_echo,
+            'dropped_stale': self.dropped_stale,
+        }
@@ -0,0 +1,97 @@
+import threading
+import time
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB."""
+    try:
+        import os
+
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        # Peak rather than current RSS; ru_maxrss is in KiB on Linux, bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ModelRegistry:
+    """Loads models on first use and records what each one cost.
+
+    Models are registered with a zero-argument loader. Only enabled models
+    can be loaded; ``warm_up`` loads them ahead of time, optionally on a
+    background thread, so the first request does not pay for it.
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = set(enabled) if enabled is not None else None
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._stats = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name, loader):
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._locks[name] = threading.Lock()
+
+    def is_enabled(self, name):
+        return name in self._loaders and (self.enabled is None or name in self.enabled)
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if not self.is_enabled(name):
+            raise RuntimeError(f"Model {name!r} is not registered or not enabled")
+
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited
+            if name in self._models:
+                return self._models[name]
+
+            rss_before = current_rss_mb()
+            start = time.perf_counter()
+            model = self._loaders[name]()
+            load_s = time.perf_counter() - start
+            rss_delta = current_rss_mb() - rss_before
+
+            self._stats[name] = {'load_s': load_s, 'rss_mb': rss_delta}
+            self._models[name] = model
+            print(f"Loaded model {name} in {load_s:.1f}s (+{rss_delta:.0f} MB)")
+            return model
+
+    def warm_up(self, names=None, background=True):
+        """Load ``names`` (all enabled models by default); returns the thread if backgrounded."""
+        names = [n for n in (names or self._loaders) if self.is_enabled(n)]
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"Warm-up of model {name} failed: {e}")
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name='model-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def report(self):
+        """Per-model load status, load time and approximate memory cost."""
+        return {
+            name: {
+                'enabled': self.is_enabled(name),
+                'loaded': self.is_loaded(name),
+                **self._stats.get(name, {}),
+            }
+            for name in self._loaders
+        }
@@ -0,0 +1,62 @@
+"""Selectable inference backends for the biomedical NER model.
+
+``torch`` is the stock transformers pipeline. ``onnx`` exports the model to
+ONNX once (optionally with dynamic int8 weight quantization), caches it on
+disk and runs it through onnxruntime behind the same pipeline interface.
+"""
+import os
+
+NER_MODEL = "d4data/biomedical-ner-all"
+
+BACKENDS = ('torch', 'onnx')
+
+DEFAULT_ONNX_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'medchat', 'onnx')
+
+
+def export_onnx(model_name=NER_MODEL, output_dir=None, quantize=False):
+    """Export ``model_name`` to ONNX under ``output_dir`` if not done yet; return (dir, file)."""
+    from optimum.onnxruntime import ORTModelForTokenClassification
+    from transformers import AutoTokenizer
+
+    output_dir = output_dir or os.path.join(DEFAULT_ONNX_DIR, model_name.replace('/', '--'))
+    model_file = 'model.onnx'
+    if not os.path.exists(os.path.join(output_dir, model_file)):
+        print(f"Exporting {model_name} to ONNX in {output_dir}...")
+        model = ORTModelForTokenClassification.from_pretrained(model_name, export=True)
+        model.save_pretrained(output_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(output_dir)
+
+    if not quantize:
+        return output_dir, model_file
+
+    quantized_file = 'model_int8.onnx'
+    if not os.path.exists(os.path.join(output_dir, quantized_file)):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        print("Quantizing ONNX model weights to int8...")
+        quantize_dynamic(
+            os.path.join(output_dir, model_file),
+            os.path.join(output_dir, quantized_file),
+            weight_type=QuantType.QInt8,
+        )
+    return output_dir, quantized_file
+
+
+def load_ner_pipeline(backend='torch', quantize=False, model_name=NER_MODEL, onnx_dir=None):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown NER backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+    # transformers pulls in torch; import it only when a model is actually loaded
+    from transformers import AutoTokenizer, pipeline
+
+    if backend == 'torch':
+        if quantize:
+            raise ValueError("int8 quantization is only available with the 'onnx' backend")
+        return pipeline("ner", model=model_name, tokenizer=model_name, aggregation_strategy="simple")
+
+    from optimum.onnxruntime import ORTModelForTokenClassification
+
+    model_dir, model_file = export_onnx(model_name, onnx_dir, quantize)
+    model = ORTModelForTokenClassification.from_pretrained(model_dir, file_name=model_file)
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    return pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
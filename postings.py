@@ -0,0 +1,78 @@
+import numpy as np
+
+
+def normalize_key(value):
+    if isinstance(value, str):
+        return ' '.join(value.lower().split())
+    return value
+
+
+class PostingIndex:
+    """Inverted index from a normalized attribute value to a row bitmap.
+
+    Each row may carry a single value or a list of values (e.g. accepted
+    insurers). Bitmaps are boolean arrays over row positions, so filters
+    combine with ``&``/``|`` and with row positions from other indexes.
+    """
+
+    def __init__(self, values):
+        postings = {}
+        n_rows = 0
+        for row, value in enumerate(values):
+            n_rows = row + 1
+            keys = value if isinstance(value, (list, tuple, np.ndarray)) else [value]
+            for key in keys:
+                postings.setdefault(normalize_key(key), []).append(row)
+        self._build(n_rows, postings)
+
+    @classmethod
+    def from_codes(cls, codes, vocabulary, n_rows, row_ids=None):
+        """Build from dictionary-encoded values.
+
+        ``codes[i]`` indexes ``vocabulary`` and belongs to row ``row_ids[i]``
+        (row ``i`` when ``row_ids`` is None, i.e. one value per row).
+        """
+        codes = np.asarray(codes)
+        row_ids = np.arange(len(codes)) if row_ids is None else np.asarray(row_ids)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(vocabulary) + 1))
+
+        postings = {}
+        for code, value in enumerate(vocabulary):
+            rows = row_ids[order[bounds[code]:bounds[code + 1]]]
+            if len(rows):
+                postings.setdefault(normalize_key(value), []).append(rows)
+
+        index = cls.__new__(cls)
+        index._build(n_rows, {key: np.concatenate(parts) for key, parts in postings.items()})
+        return index
+
+    def _build(self, n_rows, postings):
+        self.n_rows = n_rows
+        self.bitmaps = {}
+        for key, rows in postings.items():
+            bitmap = np.zeros(n_rows, dtype=bool)
+            bitmap[rows] = True
+            bitmap.flags.writeable = False
+            self.bitmaps[key] = bitmap
+        self._empty = np.zeros(n_rows, dtype=bool)
+        self._empty.flags.writeable = False
+
+    def __contains__(self, key):
+        return normalize_key(key) in self.bitmaps
+
+    def keys(self):
+        return self.bitmaps.keys()
+
+    def mask(self, key):
+        """Read-only row bitmap for ``key``; all False when the key is unknown."""
+        return self.bitmaps.get(normalize_key(key), self._empty)
+
+    def mask_any(self, keys):
+        result = self._empty.copy()
+        for key in keys:
+            result |= self.mask(key)
+        return result
+
+    def rows(self, key):
+        return np.flatnonzero(self.mask(key))
@@ -0,0 +1,37 @@
+import numpy as np
+
+
+def top_k(scores, k=None, descending=True):
+    """Positions of the ``k`` best scores, best first (all scores when ``k`` is None).
+
+    Uses ``argpartition`` so only the selected positions are sorted. Ties
+    are broken by position, matching a stable full sort.
+    """
+    keys = -np.asarray(scores) if descending else np.asarray(scores)
+    if k is None or k >= len(keys):
+        return np.argsort(keys, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    kth = keys[np.argpartition(keys, k - 1)[:k]].max()
+    # Everything tied with the k-th key competes for the last slots
+    candidates = np.flatnonzero(keys <= kth)
+    return candidates[np.lexsort((candidates, keys[candidates]))][:k]
+
+
+def top_k_rows(scores, k):
+    """Column positions of the ``k`` best scores in each row of a 2-D array, best first.
+
+    Only the candidates picked by ``argpartition`` are sorted; the order among
+    ties is by column position.
+    """
+    scores = np.asarray(scores)
+    n_cols = scores.shape[1]
+    if k >= n_cols:
+        return np.argsort(-scores, axis=1, kind='stable')
+    if k == 1:
+        return scores.argmax(axis=1)[:, None]
+
+    candidates = np.sort(np.argpartition(-scores, k - 1, axis=1)[:, :k], axis=1)
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
@@ -0,0 +1,283 @@
+"""Columnar, memory-mapped hospital registry.
+
+A registry is a directory with a ``manifest.json`` and one or more ``.npy``
+files per column. Columns are opened with ``np.load(mmap_mode='r')``, so
+worker processes share the page cache and a query only pages in the columns
+it reads. Text is stored as UTF-8 bytes plus offsets; list-valued columns
+(``specialties``, ``insurance``) are dictionary-encoded as offsets into a
+flat array of codes.
+
+``HospitalRegistry.from_source`` keeps one directory per source version
+under its path and never modifies a finished one, so a registry opened
+before a rebuild keeps reading consistent rows.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+from locks import file_lock
+
+FORMAT_VERSION = 1
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_SOURCE = os.path.join(DATA_DIR, 'hospitals.json')
+DEFAULT_REGISTRY = os.path.join(DATA_DIR, 'hospitals.registry')
+
+# Column name -> storage kind, in DataFrame column order
+HOSPITAL_SCHEMA = {
+    'name': 'string',
+    'location': 'category',
+    'coordinates': 'float64x2',
+    'specialties': 'category_list',
+    'rating': 'float64',
+    'emergency': 'bool',
+    'insurance': 'category_list',
+    'phone': 'string',
+    'type': 'category',
+}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _encode_strings(values):
+    encoded = [v.encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def _encode_category(values):
+    vocabulary = sorted(set(values))
+    lookup = {v: i for i, v in enumerate(vocabulary)}
+    return np.array([lookup[v] for v in values], dtype=np.int32), vocabulary
+
+
+def build_registry(records, path, source_hash=None):
+    """Write ``records`` (a list of hospital dicts) as a columnar registry."""
+    os.makedirs(path, exist_ok=True)
+    columns = {}
+
+    def save(name, array):
+        # Replace rather than overwrite, so processes still mapping the old
+        # files keep reading the old inode instead of a truncated one
+        target = os.path.join(path, name + '.npy')
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array))
+        os.replace(tmp, target)
+
+    for column, kind in HOSPITAL_SCHEMA.items():
+        values = [record[column] for record in records]
+
+        if kind == 'float64':
+            save(column, np.asarray(values, dtype=np.float64))
+        elif kind == 'float64x2':
+            save(column, np.asarray(values, dtype=np.float64).reshape(-1, 2))
+        elif kind == 'bool':
+            save(column, np.asarray(values, dtype=bool))
+        elif kind == 'string':
+            offsets, data = _encode_strings(values)
+            save(column + '.offsets', offsets)
+            save(column + '.data', data)
+        elif kind == 'category':
+            codes, vocabulary = _encode_category(values)
+            save(column + '.codes', codes)
+            columns[column] = {'kind': kind, 'vocabulary': vocabulary}
+            continue
+        elif kind == 'category_list':
+            codes, vocabulary = _encode_category([v for row in values for v in row])
+            offsets = np.zeros(len(values) + 1, dtype=np.int64)
+            np.cumsum([len(row) for row in values], out=offsets[1:])
+            save(column + '.offsets', offsets)
+            save(column + '.codes', codes)
+            columns[column] = {'kind': kind, 'vocabulary': vocabulary}
+            continue
+        else:
+            raise ValueError(f"Unknown column kind {kind!r} for {column!r}")
+
+        columns[column] = {'kind': kind}
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'n_rows': len(records),
+        'source_sha256': source_hash,
+        'columns': columns,
+    }
+    # Write the manifest last so a half-built registry is never picked up
+    manifest_path = os.path.join(path, 'manifest.json')
+    tmp = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path)
+
+
+def _registry_current(path, source_hash):
+    try:
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return manifest.get('format_version') == FORMAT_VERSION and manifest.get('source_sha256') == source_hash
+
+
+def remove_old_versions(path, keep):
+    """Delete version directories under ``path`` other than ``keep``, and the old unversioned layout."""
+    for entry in os.scandir(path):
+        if entry.name == keep:
+            continue
+        if entry.is_dir() and entry.name.startswith('v'):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        elif entry.is_file() and entry.name.endswith(('.npy', '.json')):
+            os.unlink(entry.path)
+
+
+class StringColumn:
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return bytes(self.data[self.offsets[row]:self.offsets[row + 1]]).decode('utf-8')
+
+    def take(self, rows):
+        return [self[row] for row in rows]
+
+
+class CategoryColumn:
+    def __init__(self, codes, vocabulary):
+        self.codes = codes
+        self.vocabulary = vocabulary
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, row):
+        return self.vocabulary[self.codes[row]]
+
+    def take(self, rows):
+        return [self.vocabulary[code] for code in self.codes[rows]]
+
+
+class ListColumn:
+    """Variable-length lists as ``offsets`` into a flat array of category ``codes``."""
+
+    def __init__(self, offsets, codes, vocabulary):
+        self.offsets = offsets
+        self.codes = codes
+        self.vocabulary = vocabulary
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return [self.vocabulary[c] for c in self.codes[self.offsets[row]:self.offsets[row + 1]]]
+
+    def take(self, rows):
+        return [self[row] for row in rows]
+
+    def row_ids(self):
+        """Row position of every entry in ``codes``."""
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+    def joined(self, sep=' '):
+        return [sep.join(self[row]) for row in range(len(self))]
+
+
+class HospitalRegistry:
+    def __init__(self, path=DEFAULT_REGISTRY):
+        self.path = path
+        with open(os.path.join(path, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        if self.manifest['format_version'] != FORMAT_VERSION:
+            raise ValueError(
+                f"Registry {path} has format version {self.manifest['format_version']}, "
+                f"expected {FORMAT_VERSION}; rebuild it"
+            )
+        self.columns = self.manifest['columns']
+        # Map every column now, so this registry keeps reading the files it
+        # was opened with even if their directory is later removed
+        self._cache = {name: self._open_column(name) for name in self.columns}
+
+    @classmethod
+    def from_source(cls, source=DEFAULT_SOURCE, path=DEFAULT_REGISTRY):
+        """Open the registry for ``source`` under ``path``, building it first if needed."""
+        source_hash = file_sha256(source)
+        version = f"v{FORMAT_VERSION}-{source_hash[:16]}"
+        version_path = os.path.join(path, version)
+        if _registry_current(version_path, source_hash):
+            return cls(version_path)
+
+        # Worker processes starting together build it once; the others wait and reuse it
+        with file_lock(path.rstrip(os.sep) + '.lock'):
+            if not _registry_current(version_path, source_hash):
+                with open(source) as f:
+                    records = json.load(f)
+                build_registry(records, version_path, source_hash)
+                remove_old_versions(path, version)
+        return cls(version_path)
+
+    def __len__(self):
+        return self.manifest['n_rows']
+
+    def _load(self, name):
+        return np.load(os.path.join(self.path, name + '.npy'), mmap_mode='r')
+
+    def _open_column(self, name):
+        spec = self.columns[name]
+        kind = spec['kind']
+        if kind == 'string':
+            return StringColumn(self._load(name + '.offsets'), self._load(name + '.data'))
+        if kind == 'category':
+            return CategoryColumn(self._load(name + '.codes'), spec['vocabulary'])
+        if kind == 'category_list':
+            return ListColumn(self._load(name + '.offsets'), self._load(name + '.codes'), spec['vocabulary'])
+        return self._load(name)
+
+    def column(self, name):
+        """Memory-mapped column, wrapped according to its storage kind."""
+        return self._cache[name]
+
+    def to_frame(self, rows=None, columns=None):
+        """Materialize ``rows`` (all by default) as a DataFrame indexed by row position."""
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.intp)
+        columns = list(self.columns) if columns is None else columns
+
+        data = {}
+        for name in columns:
+            column = self.column(name)
+            kind = self.columns[name]['kind']
+            if kind == 'float64x2':
+                data[name] = [tuple(c) for c in column[rows].tolist()]
+            elif kind in ('float64', 'bool'):
+                data[name] = column[rows]
+            else:
+                data[name] = column.take(rows)
+
+        df = pd.DataFrame(data, index=rows)
+        if 'specialties' in df:
+            df['specialties_text'] = df['specialties'].apply(lambda x: ' '.join(x))
+        if 'insurance' in df:
+            df['insurance_text'] = df['insurance'].apply(lambda x: ' '.join(x))
+        return df
+
+
+if __name__ == "__main__":
+    # python registry.py [source.json] [registry_dir]
+    source = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOURCE
+    path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_REGISTRY
+    registry = HospitalRegistry.from_source(source, path)
+    print(f"Registry {path}: {len(registry)} hospitals, columns: {', '.join(registry.columns)}")
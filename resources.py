@@ -0,0 +1,134 @@
+"""Process-wide shared models and indexes.
+
+Streamlit re-executes the app script on every interaction, but imported
+modules stay loaded, so instances held here are built once per process and
+shared by every session and thread. A resource that watches data files is
+rebuilt when one of them changes on disk; the instance it replaces is
+closed once callers still using it have had time to finish.
+"""
+import os
+import threading
+import time
+
+from cache import ResultCache, DEFAULT_CACHE_PATH
+
+CHECK_INTERVAL_S = 2.0
+# How long a replaced instance stays usable before its close hook runs
+RETIRE_AFTER_S = 30.0
+
+
+def _mtimes(paths):
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+class SharedResource:
+    def __init__(self, name, factory, watch=(), close=None):
+        self.name = name
+        self.factory = factory
+        self.watch = tuple(watch)
+        # Called with an instance after it has been replaced, to stop its threads
+        self.close = close
+        self._instance = None
+        self._mtimes = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _stale(self):
+        now = time.monotonic()
+        if not self.watch or now - self._checked_at < CHECK_INTERVAL_S:
+            return False
+        self._checked_at = now
+        return _mtimes(self.watch) != self._mtimes
+
+    def get(self):
+        instance = self._instance
+        if instance is not None and not self._stale():
+            return instance
+
+        with self._lock:
+            if self._instance is None or _mtimes(self.watch) != self._mtimes:
+                previous = self._instance
+                mtimes = _mtimes(self.watch)
+                print(f"{'Reloading' if previous is not None else 'Loading'} shared {self.name}...")
+                self._instance = self.factory()
+                self._mtimes = mtimes
+                self._checked_at = time.monotonic()
+                self._retire(previous)
+            return self._instance
+
+    def reset(self):
+        with self._lock:
+            previous, self._instance = self._instance, None
+            self._retire(previous)
+
+    def _retire(self, instance):
+        # Callers holding the previous instance keep using it until they finish
+        if instance is None or self.close is None:
+            return
+        timer = threading.Timer(RETIRE_AFTER_S, self._close, (instance,))
+        timer.daemon = True
+        timer.start()
+
+    def _close(self, instance):
+        try:
+            self.close(instance)
+        except Exception as e:
+            print(f"Error closing replaced {self.name}: {e}")
+
+
+_resources = {}
+_resources_lock = threading.Lock()
+
+
+def shared(name, factory, watch=(), close=None):
+    """Return the process-wide instance called ``name``, building it with ``factory`` if needed."""
+    with _resources_lock:
+        resource = _resources.get(name)
+        if resource is None:
+            resource = _resources[name] = SharedResource(name, factory, watch, close)
+    return resource.get()
+
+
+def get_medical_nlp():
+    from lexicon import DEFAULT_LEXICON
+    from medical import MedicalNLP
+
+    return shared(
+        'medical_nlp',
+        lambda: MedicalNLP(
+            batching=True, cache=ResultCache('symptoms', path=DEFAULT_CACHE_PATH), warm_up=True
+        ),
+        watch=[DEFAULT_LEXICON],
+        close=lambda nlp: nlp.close(),
+    )
+
+
+def get_specialist_recommender():
+    from specialist import SpecialistRecommender
+
+    return shared(
+        'specialist_recommender',
+        lambda: SpecialistRecommender(cache=ResultCache('specialist', path=DEFAULT_CACHE_PATH)),
+    )
+
+
+def get_hospital_matcher():
+    from hospital import HospitalMatcher
+    from registry import DEFAULT_SOURCE
+
+    return shared('hospital_matcher', HospitalMatcher, watch=[DEFAULT_SOURCE])
+
+
+def get_emergency_table():
+    from registry import DEFAULT_SOURCE
+    from triage import EmergencyTable
+
+    return shared(
+        'emergency_table', lambda: EmergencyTable(get_hospital_matcher()), watch=[DEFAULT_SOURCE]
+    )
@@ -0,0 +1,305 @@
+"""Headless HTTP triage service.
+
+    python service.py [--host 0.0.0.0] [--port 8080] [--workers 4]
+
+Endpoints (JSON in, JSON out):
+
+    POST /symptoms    {"text"}                          -> {"symptoms"}
+    POST /specialist  {"symptoms"} or {"text"}          -> {"specialist", "confidence"}
+    POST /hospitals   {"specialty", "city" or "location": [lat, lon],
+                       "insurance", "emergency"}        -> {"hospitals"}
+    POST /triage      {"text", "city" or "location", "insurance"}
+                                                        -> symptoms, specialist and hospitals,
+                                                           or the emergency fast path
+    GET  /health                                        -> load and model status
+
+Each worker process loads the models and indexes once (see resources.py)
+and serves requests on threads. At most ``--max-concurrency`` requests per
+worker are processed at a time; further requests wait up to
+``--queue-timeout`` seconds and then get 503, and a request that runs longer
+than ``--request-timeout`` seconds gets 504.
+"""
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cities import find_city
+from resources import get_emergency_table, get_hospital_matcher, get_medical_nlp, get_specialist_recommender
+from specialist import SPECIALIST_SPECIALTIES
+from triage import triage
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _field(body, name, kind):
+    value = body.get(name)
+    if not isinstance(value, kind) or not value:
+        raise BadRequest(f"'{name}' is required")
+    return value
+
+
+def _location(body):
+    if body.get('city'):
+        found = find_city(str(body['city']))
+        if found is None:
+            raise BadRequest(f"Unknown city {body['city']!r}")
+        return found[1]
+    location = body.get('location')
+    if location is None:
+        return None
+    try:
+        lat, lon = (float(v) for v in location)
+    except (TypeError, ValueError):
+        raise BadRequest("'location' must be [latitude, longitude]")
+    if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+        raise BadRequest("'location' must be a latitude in [-90, 90] and a longitude in [-180, 180]")
+    return lat, lon
+
+
+def _insurance(body):
+    insurance = body.get('insurance')
+    if insurance is not None and not isinstance(insurance, str):
+        raise BadRequest("'insurance' must be a string")
+    return insurance or None
+
+
+def hospitals_json(hospitals, limit=5):
+    columns = [c for c in hospitals.columns if not c.endswith('_text')]
+    # pandas converts numpy scalars and tuples to plain JSON types
+    return json.loads(hospitals[columns].head(limit).to_json(orient='records'))
+
+
+def symptoms_endpoint(body):
+    return {'symptoms': sorted(get_medical_nlp().extract_symptoms(_field(body, 'text', str)))}
+
+
+def specialist_endpoint(body):
+    symptoms = body.get('symptoms')
+    if not symptoms:
+        symptoms = get_medical_nlp().extract_symptoms(_field(body, 'text', str)) or [body['text']]
+    if not isinstance(symptoms, list) or not all(isinstance(s, str) for s in symptoms):
+        raise BadRequest("'symptoms' must be a list of strings")
+    specialist, confidence = get_specialist_recommender().recommend_specialist(symptoms)
+    return {'specialist': specialist, 'confidence': float(confidence)}
+
+
+def hospitals_endpoint(body):
+    hospitals = get_hospital_matcher().get_comprehensive_recommendation(
+        _field(body, 'specialty', str), _location(body), _insurance(body), bool(body.get('emergency'))
+    )
+    return {'hospitals': hospitals_json(hospitals)}
+
+
+def triage_endpoint(body):
+    text = _field(body, 'text', str)
+    user_location = _location(body)
+
+    # Red-flag phrases are answered from the emergency table before any model runs
+    result = triage(text, get_emergency_table(), user_location)
+    if result['emergency']:
+        hospitals = result['hospitals']
+        if hospitals is None:
+            hospitals = get_hospital_matcher().find_emergency_hospitals(None, limit=5)
+        return {
+            'emergency': True,
+            'keywords': result['keywords'],
+            'triage_ms': result['elapsed_ms'],
+            'hospitals': hospitals_json(hospitals),
+        }
+
+    symptoms = get_medical_nlp().extract_symptoms(text) or [text]
+    specialist, confidence = get_specialist_recommender().recommend_specialist(symptoms)
+    specialty = SPECIALIST_SPECIALTIES.get(specialist, 'general medicine')
+    hospitals = get_hospital_matcher().get_comprehensive_recommendation(
+        specialty, user_location, _insurance(body), False
+    )
+    return {
+        'emergency': False,
+        'symptoms': sorted(symptoms),
+        'specialist': specialist,
+        'confidence': float(confidence),
+        'hospitals': hospitals_json(hospitals),
+    }
+
+
+ENDPOINTS = {
+    '/symptoms': symptoms_endpoint,
+    '/specialist': specialist_endpoint,
+    '/hospitals': hospitals_endpoint,
+    '/triage': triage_endpoint,
+}
+
+
+class TriageServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # socketserver's default listen backlog of 5 drops connection bursts,
+    # which clients only retry after a one-second SYN timeout
+    request_queue_size = 128
+
+    def __init__(self, address, max_concurrency=8, queue_timeout=2.0, request_timeout=10.0,
+                 bind_and_activate=True):
+        super().__init__(address, TriageHandler, bind_and_activate)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        # Handler threads wait here, so a timed-out request stops blocking its client
+        self.executor = ThreadPoolExecutor(max_concurrency, thread_name_prefix='triage')
+        self.counts = {'ok': 0, 'bad_request': 0, 'rejected': 0, 'timed_out': 0, 'failed': 0}
+        self._counts_lock = threading.Lock()
+
+    def count(self, outcome):
+        with self._counts_lock:
+            self.counts[outcome] += 1
+
+    def warm_up(self):
+        """Load every shared model and index before the first request arrives"""
+        start = time.perf_counter()
+        get_medical_nlp()
+        get_specialist_recommender()
+        # Specialty TF-IDF (and scikit-learn) is otherwise loaded by the first specialty query
+        get_hospital_matcher().vectorizer
+        get_emergency_table()
+        print(f"Worker {os.getpid()} ready in {time.perf_counter() - start:.1f}s")
+
+
+class TriageHandler(BaseHTTPRequestHandler):
+    # Socket timeout for slow clients
+    timeout = 30
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self._send(404, {'error': f"Unknown path {self.path}"})
+        nlp = get_medical_nlp()
+        self._send(200, {
+            'pid': os.getpid(),
+            'requests': dict(self.server.counts),
+            'models': nlp.model_report(),
+            'cascade': nlp.cascade_stats(),
+        })
+
+    def do_POST(self):
+        endpoint = ENDPOINTS.get(self.path)
+        if endpoint is None:
+            return self._send(404, {'error': f"Unknown path {self.path}"})
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.server.count('bad_request')
+            return self._send(400, {'error': 'Invalid Content-Length'})
+        if length > MAX_BODY_BYTES:
+            self.server.count('bad_request')
+            return self._send(413, {'error': 'Request body too large'})
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(body, dict):
+                raise BadRequest("Body must be a JSON object")
+        except ValueError as e:
+            self.server.count('bad_request')
+            return self._send(400, {'error': str(e)})
+
+        server = self.server
+        if not server.slots.acquire(timeout=server.queue_timeout):
+            server.count('rejected')
+            return self._send(503, {'error': 'Server busy, retry later'})
+        future = None
+        try:
+            future = server.executor.submit(endpoint, body)
+            try:
+                result = future.result(timeout=server.request_timeout)
+            except TimeoutError:
+                server.count('timed_out')
+                return self._send(504, {'error': 'Request timed out'})
+            except BadRequest as e:
+                server.count('bad_request')
+                return self._send(400, {'error': str(e)})
+            except Exception as e:
+                server.count('failed')
+                print(f"Error in {self.path}: {e}")
+                return self._send(500, {'error': 'Internal error'})
+        finally:
+            # A timed-out computation keeps its slot until it actually finishes
+            if future is None or future.done():
+                server.slots.release()
+            else:
+                future.add_done_callback(lambda _: server.slots.release())
+
+        server.count('ok')
+        self._send(200, result)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def build_data():
+    """Build the hospital registry and TF-IDF artifacts if they are missing or stale
+
+    Run once before forking, so workers only open what is already on disk.
+    """
+    from hospital import HospitalMatcher
+    from specialist import SpecialistRecommender
+
+    HospitalMatcher().vectorizer
+    SpecialistRecommender()
+
+
+def serve(host='127.0.0.1', port=8080, workers=1, **options):
+    """Serve on ``host:port`` with ``workers`` pre-forked processes sharing the socket"""
+    server = TriageServer((host, port), **options)
+    print(f"Triage service on http://{host}:{server.server_address[1]} with {workers} worker(s)")
+    build_data()
+
+    children = []
+    for _ in range(workers - 1):
+        pid = os.fork()
+        if pid == 0:
+            children = None
+            break
+        children.append(pid)
+
+    # Models are loaded after the fork, so each worker owns its copy
+    server.warm_up()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for pid in children or ():
+            os.waitpid(pid, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--max-concurrency', type=int, default=8)
+    parser.add_argument('--queue-timeout', type=float, default=2.0)
+    parser.add_argument('--request-timeout', type=float, default=10.0)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, max_concurrency=args.max_concurrency,
+          queue_timeout=args.queue_timeout, request_timeout=args.request_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,38 @@
+import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+
+from artifacts import load_tfidf, texts_sha256
+from cache import normalize_text
+from ranking import top_k_rows
+
+# Specialist -> hospital specialty searched for them
+SPECIALIST_SPECIALTIES = {
+    'Cardiologist': 'cardiology',
+    'Dermatologist': 'dermatology',
+    'Gastroenterologist': 'gastroenterology',
+    'Neurologist': 'neurology',
+    'Pulmonologist': 'pulmonology',
+    'Orthopedist': 'orthopedics',
+    'Psychiatrist': 'psychiatry',
+    'General Practitioner': 'general medicine'
+}
 
 class SpecialistRecommender:
-    def __init__(self):
+    def __init__(self, cache=None):
+        # Optional cache.ResultCache keyed by data version, k and the normalized symptom text
+        self.cache = cache
         self.specialist_data = self.create_specialist_database()
-        self.vectorizer = TfidfVectorizer()
-        self.symptom_vectors = self.vectorizer.fit_transform(
-            self.specialist_data['symptoms_text']
+        self.specialists = list(self.specialist_data['specialist'])
+        # Cached results are only reused while the specialist data is unchanged
+        self.cache_version = texts_sha256(
+            self.specialists + list(self.specialist_data['symptoms_text'])
+        )[:16]
+        # TfidfVectorizer L2-normalizes rows, so a dot product is the cosine similarity.
+        # The fitted vectorizer is reused from disk until the specialist data changes.
+        self.vectorizer, self.symptom_vectors = load_tfidf(
+            'specialist_symptoms', list(self.specialist_data['symptoms_text']), norm='l2'
         )
+        self.symptom_vectors_t = self.symptom_vectors.T.tocsr()
     
     def create_specialist_database(self):
         specialists = {
@@ -57,18 +81,42 @@ class SpecialistRecommender:
         
         return pd.DataFrame(data)
     
-    def recommend_specialist(self, symptoms):
-        if not symptoms:
-            return "General Practitioner", 0.5
-        
-        query_text = ' '.join(symptoms)
-        query_vector = self.vectorizer.transform([query_text])
+    def recommend_batch(self, symptom_lists, k=3):
+        """Top-``k`` (specialist, score) pairs for each list of symptoms."""
+        results = [None] * len(symptom_lists)
+        queries = []
+        positions = []
+        keys = []
+        for i, symptoms in enumerate(symptom_lists):
+            if not symptoms:
+                results[i] = [("General Practitioner", 0.5)]
+                continue
+            
+            query = ' '.join(symptoms)
+            if self.cache is not None:
+                # Word order does not change TF-IDF scores
+                key = f"{self.cache_version}:{k}:{' '.join(sorted(normalize_text(query).split()))}"
+                cached = self.cache.get(key)
+                if cached is not None:
+                    results[i] = [tuple(pair) for pair in cached]
+                    continue
+                keys.append(key)
+            queries.append(query)
+            positions.append(i)
         
-        similarities = cosine_similarity(query_vector, self.symptom_vectors)[0]
+        if queries:
+            scores = (self.vectorizer.transform(queries) @ self.symptom_vectors_t).toarray()
+            best = top_k_rows(scores, min(k, len(self.specialists)))
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            for row, i in enumerate(positions):
+                results[i] = [
+                    (self.specialists[col], float(score))
+                    for col, score in zip(best[row], best_scores[row])
+                ]
+                if self.cache is not None:
+                    self.cache.set(keys[row], results[i])
         
-        best_match_idx = similarities.argmax()
-        confidence = similarities[best_match_idx]
-        
-        specialist = self.specialist_data.iloc[best_match_idx]['specialist']
-        
-        return specialist, confidence
\ No newline at end of file
+        return results
+    
+    def recommend_specialist(self, symptoms):
+        return self.recommend_batch([symptoms], k=1)[0][0]
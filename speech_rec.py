@@ -1,36 +1,286 @@
 import speech_recognition as sr
-import pyttsx3
-from gtts import gTTS
-import pygame
-import tempfile
-import os
+import asyncio
+import io
+import queue
+import re
+import time
+import threading
+from concurrent.futures import Future
+
+from asr import load_asr
+from microphone import MicrophoneSession
+from tts_cache import TTSCache, audio_key
+
+class SpeechHandle:
+    """One queued utterance; callers can wait on it, await it or cancel it."""
+
+    def __init__(self, text):
+        self.text = text
+        self._future = Future()
+        self._cancel_requested = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_requested.is_set()
+
+    def cancel(self):
+        """Stop this utterance, before or during playback; False if it already finished."""
+        if self._future.done():
+            return False
+        self._cancel_requested.set()
+        return True
+
+    def done(self):
+        return self._future.done()
+
+    def wait(self, timeout=None):
+        """Block until finished; True if it was played to the end, False if cancelled."""
+        return self._future.result(timeout)
+
+    def __await__(self):
+        return asyncio.wrap_future(self._future).__await__()
+
+    def _finish(self, played):
+        if not self._future.done():
+            self._future.set_result(played)
+
+    def _fail(self, error):
+        if not self._future.done():
+            self._future.set_exception(error)
+
+class SpeechGroup:
+    """The per-sentence handles of one streamed response."""
+
+    def __init__(self, handles):
+        self.handles = handles
+
+    def cancel(self):
+        return any([handle.cancel() for handle in self.handles])
+
+    def done(self):
+        return all(handle.done() for handle in self.handles)
+
+    def wait(self, timeout=None):
+        """Block until every sentence finished; True if all were played."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        played = True
+        for handle in self.handles:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            played = handle.wait(remaining) and played
+        return played
+
+    def __await__(self):
+        results = yield from asyncio.gather(
+            *(asyncio.wrap_future(handle._future) for handle in self.handles)
+        ).__await__()
+        return all(results)
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+# A list number such as "hospitals for you: 1." belongs to the next sentence
+_LIST_MARKER = re.compile(r'(?:^|(?<=[:;,]))\s*\d{1,2}\.$')
+
+def split_sentences(text, min_chars=20):
+    """Split ``text`` into sentences, gluing short fragments ("1.", "Dr.") to the next one."""
+    sentences = []
+    pending = ''
+    for part in _SENTENCE_END.split(text.strip()):
+        pending = f"{pending} {part}" if pending else part
+        marker = _LIST_MARKER.search(pending)
+        if marker and marker.start() > 0:
+            sentences.append(pending[:marker.start()])
+            pending = marker.group().strip()
+            continue
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ''
+    if pending:
+        if sentences:
+            sentences[-1] += ' ' + pending
+        else:
+            sentences.append(pending)
+    return sentences
 
 class VoiceProcessor:
-    def __init__(self):
+    VOICE = 'gtts'
+
+    def __init__(self, lang='en', tts_cache=None, asr_backend='auto'):
         self.recognizer = sr.Recognizer()
         self.microphone = sr.Microphone()
-        
+        self.lang = lang
+        self.tts_cache = tts_cache if tts_cache is not None else TTSCache()
+        # 'auto' adds an offline Vosk fallback, with partial results, when a model is installed
+        self.asr = load_asr(asr_backend, self.recognizer)
+        # Set to a callable to receive partial transcripts while the user speaks
+        self.on_partial = None
+        # Opened and calibrated on first use, then kept listening
+        self.mic_session = MicrophoneSession(
+            self.recognizer, self.microphone, spoke_since=self.spoke_since,
+            asr=self.asr, on_partial=self._partial
+        )
+
+        # Synthesis runs one utterance ahead of playback, so the next message
+        # is rendered while the current one is playing
+        self._synthesis_queue = queue.Queue()
+        self._playback_queue = queue.Queue(maxsize=1)
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._current = None
+        self._speech_ended_at = None
+        threading.Thread(target=self._synthesis_worker, name='tts-synthesis', daemon=True).start()
+        threading.Thread(target=self._playback_worker, name='tts-playback', daemon=True).start()
+
+    def capture_phrase(self, timeout=10):
+        """Wait for pending speech, then return the user's next phrase as AudioData"""
+        # Don't record our own prompt
+        self.wait_for_speech()
+        # An answer may start as soon as the prompt ends, before we get here
+        since = self._speech_ended_at if self._speech_ended_at is not None else time.monotonic()
+        return self.mic_session.capture_phrase(timeout=timeout, since=since)
+
+    def recognize(self, audio):
+        """Transcribe AudioData; raises sr.UnknownValueError / sr.RequestError like recognize_google"""
+        return self.asr.recognize(audio)
+
+    def _partial(self, text):
+        if self.on_partial is not None:
+            self.on_partial(text)
+
+    def spoke_since(self, started_at):
+        """True if speech output was playing at any point after ``started_at``"""
+        if self._current is not None:
+            return True
+        return self._speech_ended_at is not None and self._speech_ended_at > started_at
+
     def listen_to_speech(self):
-        with self.microphone as source:
-            print("Listening... Please describe your symptoms.")
-            self.recognizer.adjust_for_ambient_noise(source)
-            audio = self.recognizer.listen(source, timeout=10)
-        
+        print("Listening... Please describe your symptoms.")
+        audio = self.capture_phrase(timeout=10)
+
         try:
-            text = self.recognizer.recognize_google(audio)
+            text = self.recognize(audio)
             return text.lower()
         except sr.UnknownValueError:
             return "Sorry, I couldn't understand that."
         except sr.RequestError:
             return "Speech recognition service unavailable."
-    
+
     def speak_response(self, text):
-        tts = gTTS(text=text, lang='en')
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp_file:
-            tts.save(tmp_file.name)
-            pygame.mixer.init()
-            pygame.mixer.music.load(tmp_file.name)
-            pygame.mixer.music.play()
-            while pygame.mixer.music.get_busy():
-                pygame.time.wait(100)
-        os.unlink(tmp_file.name)
\ No newline at end of file
+        """Queue ``text`` for speech and return a SpeechHandle immediately"""
+        handle = SpeechHandle(text)
+        with self._idle:
+            self._pending += 1
+        self._synthesis_queue.put(handle)
+        return handle
+
+    def speak_streaming(self, text):
+        """Queue ``text`` sentence by sentence and return a SpeechGroup.
+
+        The first sentence starts playing as soon as it is synthesized, and
+        each following one is synthesized while the previous one plays.
+        """
+        return SpeechGroup([self.speak_response(sentence) for sentence in split_sentences(text)])
+
+    def wait_for_speech(self, timeout=None):
+        """Block until everything queued so far has been spoken or cancelled"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def cancel_speech(self):
+        """Cancel the current utterance and everything queued after it"""
+        queued = list(self._synthesis_queue.queue)
+        queued += [handle for handle, _ in list(self._playback_queue.queue)]
+        current = self._current
+        for handle in queued + ([current] if current is not None else []):
+            handle.cancel()
+
+    def _finished(self, handle, played=None, error=None):
+        if error is not None:
+            handle._fail(error)
+        else:
+            handle._finish(played)
+        with self._idle:
+            self._pending -= 1
+            self._idle.notify_all()
+
+    def prewarm(self, texts, background=True):
+        """Synthesize ``texts`` into the audio cache ahead of their first use
+
+        Prewarmed audio is also persisted, so fixed prompts are rendered once
+        per machine rather than once per process.
+        """
+        def run():
+            for text in texts:
+                try:
+                    self._synthesize(text, persist=True)
+                except Exception as e:
+                    print(f"Could not prewarm speech for {text[:40]!r}: {e}")
+                    return
+
+        if not background:
+            return run()
+        thread = threading.Thread(target=run, name='tts-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+    def _synthesize(self, text, persist=False):
+        """MP3 bytes for ``text``, from the audio cache when it was spoken before
+
+        Audio is rendered into memory and, unless ``persist`` is set, never
+        written to disk.
+        """
+        key = audio_key(text, self.VOICE, self.lang)
+        audio = self.tts_cache.get(key)
+        if audio is None:
+            from gtts import gTTS
+
+            buffer = io.BytesIO()
+            gTTS(text=text, lang=self.lang).write_to_fp(buffer)
+            audio = buffer.getvalue()
+            self.tts_cache.put(key, audio, persist=persist)
+        return audio
+
+    def _synthesis_worker(self):
+        while True:
+            handle = self._synthesis_queue.get()
+            if handle.cancelled:
+                self._finished(handle, played=False)
+                continue
+            try:
+                audio = self._synthesize(handle.text)
+            except Exception as e:
+                print(f"Speech synthesis failed: {e}")
+                self._finished(handle, error=e)
+                continue
+            # Blocks while the previous utterance is still waiting to play
+            self._playback_queue.put((handle, audio))
+
+    def _playback_worker(self):
+        import pygame
+
+        mixer_ready = False
+        while True:
+            handle, audio = self._playback_queue.get()
+            self._current = handle
+            try:
+                if handle.cancelled:
+                    self._finished(handle, played=False)
+                    continue
+                if not mixer_ready:
+                    pygame.mixer.init()
+                    mixer_ready = True
+
+                pygame.mixer.music.load(io.BytesIO(audio), 'mp3')
+                pygame.mixer.music.play()
+                while pygame.mixer.music.get_busy():
+                    if handle.cancelled:
+                        pygame.mixer.music.stop()
+                        break
+                    pygame.time.wait(50)
+                pygame.mixer.music.unload()
+                # Before _finished, so a listener woken by it sees the new end time
+                self._speech_ended_at = time.monotonic()
+                self._finished(handle, played=not handle.cancelled)
+            except Exception as e:
+                print(f"Audio playback failed: {e}")
+                self._finished(handle, error=e)
+            finally:
+                self._current = None
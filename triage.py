@@ -0,0 +1,148 @@
+"""Keyword pre-triage with precomputed nearest-emergency tables.
+
+``triage`` runs before any model. A single compiled regex flags red-flag
+phrases, and the nearest emergency hospitals for every known city are
+computed once per registry, so an emergency caller is given hospitals in
+a few milliseconds instead of after NER, specialist scoring and two more
+questions.
+"""
+import re
+import sys
+import time
+
+from cities import CITY_COORDINATES, find_city_mention
+
+EMERGENCY_KEYWORDS = (
+    'chest pain', 'shortness of breath', 'severe pain', 'bleeding', 'unconscious',
+    'heart attack', 'stroke', 'seizure', 'not breathing', "can't breathe", 'cannot breathe',
+    'choking', 'fainted', 'overdose', 'poisoning', 'severe burn',
+)
+
+# Longest first, so "severe pain" is reported rather than a shorter overlap.
+# One group per keyword maps inflected matches ("chest pains", "seizures")
+# back to the keyword.
+_KEYWORDS_BY_LENGTH = sorted(EMERGENCY_KEYWORDS, key=len, reverse=True)
+_EMERGENCY_PATTERN = re.compile(
+    r'\b(?:' + '|'.join(f'({re.escape(k)})' for k in _KEYWORDS_BY_LENGTH) + r')(?:e?s)?\b',
+    re.IGNORECASE,
+)
+
+TRIAGE_BUDGET_MS = 50.0
+
+# A keyword preceded by one of these within NEGATION_WINDOW words of the
+# same clause is not flagged ("no chest pain", "never had a seizure")
+NEGATION_CUES = frozenset((
+    'no', 'not', 'without', 'never', 'denies', 'deny', 'denied', 'dont', 'doesnt', 'didnt',
+    'isnt', 'wasnt', 'havent', 'hasnt', 'hadnt', 'arent', 'werent',
+))
+NEGATION_WINDOW = 3
+# Bleeding described as minor ("bleeding slightly", "a little bleeding") is not flagged
+_MINOR_BLEEDING = re.compile(
+    r'\b(?:slight|slightly|minor|little|bit of)\s+bleeding\b|\bbleeding\s+(?:slightly|a little|a bit|lightly)\b',
+    re.IGNORECASE,
+)
+_CLAUSE_BREAK = re.compile(r'[.,;:!?]|\bbut\b', re.IGNORECASE)
+_CUE_WORD = re.compile(r"[a-z']+")
+
+# (text, expected keywords), checked by ``python triage.py``
+TRIAGE_CASES = (
+    ("my chest pains are getting worse", ['chest pain']),
+    ("severe pains in my stomach", ['severe pain']),
+    ("he is having seizures", ['seizure']),
+    ("he is not breathing", ['not breathing']),
+    ("I can't breathe", ["can't breathe"]),
+    ("I have no chest pain, just a headache", []),
+    ("I am not unconscious", []),
+    ("no fever or chest pain", []),
+    ("I don't have chest pain but I fainted", ['fainted']),
+    ("never had a seizure before", []),
+    ("patient denies bleeding", []),
+    ("a paper cut that is bleeding slightly", []),
+    ("slight bleeding from the gums", []),
+    ("no headache, but there is heavy bleeding", ['bleeding']),
+    ("mild headache", []),
+)
+
+
+def _negated(text, start):
+    clause = _CLAUSE_BREAK.split(text[:start])[-1]
+    words = [w.replace("'", '') for w in _CUE_WORD.findall(clause.lower())]
+    return any(w in NEGATION_CUES for w in words[-NEGATION_WINDOW:])
+
+
+def emergency_keywords(text):
+    """Red-flag phrases found in ``text``, in order of appearance, unless negated."""
+    minor = [m.span() for m in _MINOR_BLEEDING.finditer(text)]
+    found = []
+    for match in _EMERGENCY_PATTERN.finditer(text):
+        keyword = _KEYWORDS_BY_LENGTH[match.lastindex - 1]
+        if keyword in found or _negated(text, match.start()):
+            continue
+        if keyword == 'bleeding' and any(a <= match.start() < b for a, b in minor):
+            continue
+        found.append(keyword)
+    return found
+
+
+class EmergencyTable:
+    """The nearest ``n_nearest`` emergency hospitals for each known city, precomputed."""
+
+    def __init__(self, hospital_matcher, cities=CITY_COORDINATES, n_nearest=5, max_distance=100):
+        self.hospital_matcher = hospital_matcher
+        self.n_nearest = n_nearest
+        self.max_distance = max_distance
+
+        start = time.perf_counter()
+        # Keyed by coordinates: cities sharing them ("delhi", "new delhi") share a result
+        self.tables = {}
+        for coords in cities.values():
+            if coords not in self.tables:
+                self.tables[coords] = hospital_matcher.find_emergency_hospitals(
+                    coords, max_distance=max_distance, limit=n_nearest
+                )
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+    def nearest(self, location):
+        """Precomputed hospitals for a known city's coordinates, else a live query."""
+        hospitals = self.tables.get(tuple(location))
+        if hospitals is None:
+            hospitals = self.hospital_matcher.find_emergency_hospitals(
+                location, max_distance=self.max_distance, limit=self.n_nearest
+            )
+        return hospitals
+
+
+def triage(text, table, user_location=None, budget_ms=TRIAGE_BUDGET_MS):
+    """Flag an emergency in ``text`` and look up the nearest emergency hospitals.
+
+    Returns a dict with ``emergency``, ``keywords``, ``city``, ``location``,
+    ``hospitals`` (None when no location is known yet) and ``elapsed_ms``.
+    """
+    start = time.perf_counter()
+    keywords = emergency_keywords(text)
+    result = {'emergency': bool(keywords), 'keywords': keywords, 'city': None,
+              'location': user_location, 'hospitals': None}
+
+    if keywords:
+        # Only a city clearly given as the caller's location ("in Pune");
+        # otherwise the caller is asked rather than guessed at
+        found = find_city_mention(text)
+        if found is not None:
+            result['city'], result['location'] = found
+        if result['location'] is not None:
+            result['hospitals'] = table.nearest(result['location'])
+
+    result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+    if result['elapsed_ms'] > budget_ms:
+        print(f"⚠️ Triage took {result['elapsed_ms']:.1f} ms (budget {budget_ms:.0f} ms)")
+    return result
+
+
+if __name__ == "__main__":
+    # python triage.py: check the keyword matcher against TRIAGE_CASES
+    failures = [(text, expected, emergency_keywords(text)) for text, expected in TRIAGE_CASES
+                if emergency_keywords(text) != expected]
+    for text, expected, got in failures:
+        print(f"FAIL {text!r}: expected {expected}, got {got}")
+    print(f"{len(TRIAGE_CASES) - len(failures)}/{len(TRIAGE_CASES)} triage cases pass")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,123 @@
+"""Content-addressed cache of synthesized speech.
+
+Audio is keyed by ``sha256(text, voice, lang)`` and held in a byte-bounded
+in-memory LRU, from which it is played without touching the disk. Entries
+put with ``persist=True`` (the fixed prompts) are also written to one file
+per key, so they are only synthesized once per machine. The directory is
+bounded by total size and evicted oldest-first.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_TTS_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'medchat', 'tts')
+
+
+def audio_key(text, voice, lang):
+    payload = json.dumps([text, voice, lang], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, path=DEFAULT_TTS_CACHE_DIR, max_bytes=64 << 20, memory_bytes=16 << 20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> audio bytes
+        self._memory_size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(path, exist_ok=True)
+        # key -> size on disk, oldest first
+        files = []
+        for entry in os.scandir(path):
+            if entry.name.endswith('.mp3') and entry.is_file():
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        self._files = OrderedDict((key, size) for _, key, size in sorted(files))
+        self._disk_size = sum(self._files.values())
+
+    def _file(self, key):
+        return os.path.join(self.path, key + '.mp3')
+
+    def __contains__(self, key):
+        return key in self._memory or key in self._files
+
+    def get(self, key):
+        """Audio bytes for ``key``, or None if it has not been synthesized yet."""
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio
+            if key not in self._files:
+                self.misses += 1
+                return None
+
+        try:
+            with open(self._file(key), 'rb') as f:
+                audio = f.read()
+        except OSError:
+            with self._lock:
+                self._disk_size -= self._files.pop(key, 0)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if key in self._files:
+                self._files.move_to_end(key)
+            self._remember(key, audio)
+            self.hits += 1
+        return audio
+
+    def put(self, key, audio, persist=True):
+        """Cache ``audio``; with ``persist=False`` it is only kept in memory."""
+        if not persist:
+            with self._lock:
+                self._remember(key, audio)
+            return
+
+        target = self._file(key)
+        tmp = f"{target}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(audio)
+        os.replace(tmp, target)
+
+        with self._lock:
+            self._disk_size += len(audio) - self._files.pop(key, 0)
+            self._files[key] = len(audio)
+            self._remember(key, audio)
+            while self._disk_size > self.max_bytes and len(self._files) > 1:
+                evicted, size = self._files.popitem(last=False)
+                self._disk_size -= size
+                self.evictions += 1
+                try:
+                    os.unlink(self._file(evicted))
+                except OSError:
+                    pass
+
+    def _remember(self, key, audio):
+        self._memory_size += len(audio) - len(self._memory.pop(key, b''))
+        self._memory[key] = audio
+        while self._memory_size > self.memory_bytes and len(self._memory) > 1:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_size -= len(dropped)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'files': len(self._files),
+            'disk_bytes': self._disk_size,
+            'max_bytes': self.max_bytes,
+            'in_memory': len(self._memory),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+        }